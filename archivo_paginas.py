@@ -0,0 +1,108 @@
+import mmap
+import os
+import threading
+
+# Archivo local de las imágenes de cada boletín, para no volver a descargarlas.
+# Por boletín hay dos archivos:
+#   {fecha}.pack -> bytes de las imágenes concatenados (solo se agrega al final)
+#   {fecha}.idx  -> una línea "pagina<TAB>offset<TAB>longitud" por imagen
+# El índice se escribe DESPUÉS de los datos, así que un corte a medias solo deja
+# bytes huérfanos al final del pack, nunca una entrada que apunte a basura.
+# Al cargar solo valen las líneas completas (terminan en "\n"), numéricas y que caben en
+# el pack; una última línea cortada se quita del .idx para no pegarle la siguiente.
+
+
+class ArchivoBoletin:
+    def __init__(self, fecha, carpeta: str = "archivo"):
+        nombre = fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha)
+        os.makedirs(carpeta, exist_ok=True)
+
+        self.ruta = os.path.join(carpeta, f"{nombre}.pack")
+        self.ruta_indice = os.path.join(carpeta, f"{nombre}.idx")
+        self._indice: dict[int, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._mapa = None
+        self._archivo = None
+
+        self._cargar_indice()
+
+    def _cargar_indice(self):
+        if not os.path.exists(self.ruta_indice):
+            return
+        tam_pack = os.path.getsize(self.ruta) if os.path.exists(self.ruta) else 0
+        with open(self.ruta_indice, "rb") as f:
+            contenido = f.read()
+
+        completo = contenido.rfind(b"\n") + 1
+        if completo < len(contenido):
+            # última línea cortada durante la escritura (p. ej. "12\t40960\t1" sin el resto)
+            with open(self.ruta_indice, "r+b") as f:
+                f.truncate(completo)
+
+        for linea in contenido[:completo].splitlines():
+            partes = linea.split()
+            if len(partes) != 3:
+                continue
+            try:
+                pagina, offset, longitud = (int(x) for x in partes)
+            except ValueError:
+                continue
+            if offset < 0 or longitud < 0 or offset + longitud > tam_pack:
+                # apunta fuera del pack: la imagen se vuelve a descargar
+                continue
+            self._indice[pagina] = (offset, longitud)
+
+    def __contains__(self, pagina: int) -> bool:
+        return pagina in self._indice
+
+    def __len__(self) -> int:
+        return len(self._indice)
+
+    def paginas(self) -> list[int]:
+        return sorted(self._indice)
+
+    def leer(self, pagina: int) -> bytes | None:
+        with self._lock:
+            entrada = self._indice.get(pagina)
+            if entrada is None:
+                return None
+            offset, longitud = entrada
+
+            # El pack crece mientras se descarga: se vuelve a mapear si hace falta
+            if self._mapa is None or offset + longitud > len(self._mapa):
+                self._remapear()
+            return self._mapa[offset:offset + longitud]
+
+    def _remapear(self):
+        self._cerrar_mapa()
+        self._archivo = open(self.ruta, "rb")
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def guardar(self, pagina: int, contenido: bytes) -> None:
+        with self._lock:
+            if pagina in self._indice:
+                return
+
+            with open(self.ruta, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(contenido)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with open(self.ruta_indice, "a", encoding="utf-8") as f:
+                f.write(f"{pagina}\t{offset}\t{len(contenido)}\n")
+
+            self._indice[pagina] = (offset, len(contenido))
+
+    def _cerrar_mapa(self):
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrar_mapa()
@@ -0,0 +1,68 @@
+# Inserción de expedientes contra SQLite en memoria (sin postgres ni red).
+# Mide el costo del lado de Python/SQLAlchemy (normalizar_registro + executemany por lotes);
+# el camino COPY de postgres no aplica aquí.
+from benchmarks.comun import Caso, importar, requiere
+from benchmarks.fixtures import expedientes_sinteticos
+
+GRUPO = "db"
+
+REGISTROS = 5000
+
+SQL_CREAR_EXPEDIENTES = """
+create table expedientes (
+  id integer primary key autoincrement,
+  id_expediente text,
+  juzgado text,
+  actor_demandante text,
+  demandado text,
+  tipo_juicio text,
+  fecha_publicacion date,
+  extracto_acuerdo text,
+  estatus_riesgo text,
+  numero_boletin integer,
+  numero_pagina integer,
+  estatus text
+)
+"""
+
+
+def casos(corpus: str | None = None) -> list[Caso]:
+    requiere("sqlalchemy")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+
+    db = importar("db")
+    repository = importar("repository")
+    dedup = importar("dedup")
+
+    # Una sola conexión compartida: la base en memoria vive lo que vive la conexión
+    motor = create_engine("sqlite://", future=True, poolclass=StaticPool,
+                          connect_args={"check_same_thread": False})
+    with motor.begin() as conn:
+        conn.execute(text(SQL_CREAR_EXPEDIENTES))
+
+    registros = expedientes_sinteticos(REGISTROS)
+
+    def vaciar():
+        with motor.begin() as conn:
+            conn.execute(text("delete from expedientes"))
+
+    def insertar_bulk():
+        # El engine perezoso de db apunta a SQLite solo durante la llamada
+        original = db._engine
+        db._engine = motor
+        try:
+            repository.insertar_expedientes_bulk(registros)
+        finally:
+            db._engine = original
+
+    def filtrar_dedup():
+        # Mitad precargada (como si viniera de la base), mitad nueva
+        indice = dedup.IndiceDedup()
+        indice.precargar(registros[::2])
+        indice.filtrar(registros)
+
+    return [
+        Caso("insertar_expedientes_bulk", insertar_bulk, REGISTROS, "fila", preparar=vaciar),
+        Caso("dedup_precargar_filtrar", filtrar_dedup, REGISTROS, "fila"),
+    ]
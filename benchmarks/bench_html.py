@@ -0,0 +1,30 @@
+# Parseo del listado de boletines y del JS del visor sobre HTML fijo (sin red)
+import contextlib
+import io
+
+from benchmarks.comun import Caso, importar
+from benchmarks.fixtures import html_listado, js_visor
+
+GRUPO = "html"
+
+FILAS_LISTADO = 250
+PAGINAS_VISOR = 378
+
+
+def casos(corpus: str | None = None) -> list[Caso]:
+    ej = importar("extractor_js")
+    listado = html_listado(FILAS_LISTADO)
+    visor = js_visor(PAGINAS_VISOR)
+
+    def externos():
+        # extraer_externos imprime el número de filas; no ensuciar la salida
+        with contextlib.redirect_stdout(io.StringIO()):
+            ej.extraer_externos(listado, True)
+
+    def paginas_js():
+        ej.extraer_paginas_js(visor)
+
+    return [
+        Caso("extraer_externos", externos, FILAS_LISTADO, "fila"),
+        Caso("extraer_paginas_js", paginas_js, PAGINAS_VISOR, "página"),
+    ]
@@ -0,0 +1,57 @@
+# Preprocesado y OCR por columnas sobre páginas JPEG sintéticas (PIL), en memoria
+import shutil
+
+from benchmarks.comun import Caso, importar, requiere
+from benchmarks.fixtures import jpeg_dos_columnas
+
+GRUPO = "imagenes"
+
+PAGINAS = 3
+
+
+def _hay_tesseract(ocr) -> bool:
+    if ocr.usar_motor_persistente():
+        return True
+    return shutil.which(ocr.settings.tesseract_cmd) is not None or shutil.which("tesseract") is not None
+
+
+def casos(corpus: str | None = None) -> list[Caso]:
+    requiere("PIL", "cv2", "numpy")
+    images = importar("images")
+    ocr = importar("ocr")
+
+    jpegs = [jpeg_dos_columnas(semilla=s) for s in range(PAGINAS)]
+
+    def preprocesar():
+        for contenido in jpegs:
+            images.preprocesar_imagen(contenido)
+
+    def preprocesar_columna():
+        for contenido in jpegs:
+            images.preprocesar_imagen_columna(contenido)
+
+    layout = importar("layout")
+    columnas = [images.preprocesar_imagen_columna(c) for c in jpegs]
+
+    def regiones():
+        for img in columnas:
+            layout.regiones_columnas(img, 2)
+
+    lista = [
+        Caso("preprocesar_imagen", preprocesar, PAGINAS, "página"),
+        Caso("preprocesar_imagen_columna", preprocesar_columna, PAGINAS, "página"),
+        Caso("regiones_columnas", regiones, PAGINAS, "página"),
+    ]
+
+    if _hay_tesseract(ocr):
+        # El OCR domina el tiempo de una página; se mide sobre imágenes ya preprocesadas
+        def ocr_columnas():
+            for img in columnas:
+                images.ocr_por_columnas(img)
+
+        lista.append(Caso("ocr_por_columnas", ocr_columnas, PAGINAS, "página"))
+    else:
+        print("  ocr_por_columnas omitido: no se encontró tesseract")
+
+    return lista
+
@@ -0,0 +1,115 @@
+"""
+Microbenchmark de normalizacion.py contra las funciones anteriores de
+text_extractor / extractor_js (copiadas abajo tal cual como referencia).
+
+    python benchmarks/bench_normalizacion.py
+    python benchmarks/bench_normalizacion.py --corpus "revision_boletin*.txt"
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalizacion import normalizar_bloque, quitar_encabezados, normalizar_fechas
+from benchmarks.comun import Caso
+from benchmarks.corpus import cargar_corpus
+
+GRUPO = "normalizacion"
+
+# -----------------------------
+# Implementaciones anteriores
+# -----------------------------
+RE_DIAS = re.compile(r"\b(Lunes|Martes|Mi[eé]rcoles|Jueves|Viernes|S[aá]bado|Domingo)\b", re.IGNORECASE)
+
+
+def normalize_anterior(text: str) -> str:
+    t = text.replace("\r", " ").replace("\n", " ")
+    t = re.sub(r"\s+", " ", t).strip()
+    t = t.replace("‘", "'").replace("’", "'").replace("´", "'").replace("“", '"').replace("”", '"')
+    t = re.sub(r"\bvs\b", "vs.", t, flags=re.IGNORECASE)
+    t = re.sub(r"\bvs\.\s*\.", "vs.", t, flags=re.IGNORECASE)
+    t = re.sub(r"T\s*\.\s*Ap\s*\.", "T.Ap", t, flags=re.IGNORECASE)
+    t = re.sub(r"T\s*\.?\s*Ap\b", "T.Ap", t, flags=re.IGNORECASE)
+    t = re.sub(r"T\s*\.", "T.", t, flags=re.IGNORECASE)
+    return t
+
+
+def strip_headers_anterior(s: str) -> str:
+    u = s.strip()
+    u = re.sub(r"^.*?\bACUERDOS\s+DEL\b\s+.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
+    u = re.sub(r"^.*?\bBOLETIN\b.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
+    u = re.sub(r"^.*?\b(PRIMERA|SEGUNDA|TERCERA)\s+SALA\b.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
+    if RE_DIAS.search(u) and re.search(r"\b\d{4}\b", u):
+        u = re.sub(r"^.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
+    u = re.sub(r"^\s*(?:lo|l0|I0|IO|I|l)\.?\s*\d+\s*", "", u, flags=re.IGNORECASE)
+    u = re.sub(r"^\s*AS\s+", "", u, flags=re.IGNORECASE)
+    return u.strip()
+
+
+def normalizar_fechas_anterior(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = re.sub(r"\s+", " ", s).strip()
+    return s.lower()
+
+
+PARES = [
+    ("_normalize", normalize_anterior, normalizar_bloque),
+    ("_strip_headers", strip_headers_anterior, quitar_encabezados),
+    ("_normalizar_fechas", normalizar_fechas_anterior, normalizar_fechas),
+]
+
+
+def _medir(fn, paginas, repeticiones):
+    tiempos = timeit.repeat(lambda: [fn(p) for p in paginas], number=1, repeat=repeticiones)
+    return min(tiempos)
+
+
+def ejecutar(paginas, repeticiones=5) -> list[dict]:
+    resultados = []
+    for nombre, anterior, nueva in PARES:
+        # Mismo resultado antes de comparar tiempos
+        for p in paginas:
+            if anterior(p) != nueva(p):
+                raise AssertionError(f"{nombre}: salida distinta para {p[:80]!r}")
+
+        t_anterior = _medir(anterior, paginas, repeticiones)
+        t_nueva = _medir(nueva, paginas, repeticiones)
+        resultados.append({
+            "funcion": nombre,
+            "paginas": len(paginas),
+            "anterior_ms": round(t_anterior * 1000, 3),
+            "nueva_ms": round(t_nueva * 1000, 3),
+            "aceleracion": round(t_anterior / t_nueva, 2) if t_nueva else None,
+        })
+    return resultados
+
+
+def casos(corpus: str | None = None) -> list[Caso]:
+    # Para benchmarks/run.py: solo las implementaciones actuales
+    paginas = cargar_corpus(corpus)
+
+    def medir(fn):
+        return lambda: [fn(p) for p in paginas]
+
+    return [Caso(nombre, medir(nueva), len(paginas), "página") for nombre, _, nueva in PARES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="glob de transcripciones revision_boletin*.txt")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    paginas = cargar_corpus(args.corpus)
+    for r in ejecutar(paginas, args.repeticiones):
+        print(f"{r['funcion']:<20} {r['paginas']:>4} págs  anterior {r['anterior_ms']:>9.3f} ms"
+              f"  nueva {r['nueva_ms']:>9.3f} ms  x{r['aceleracion']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Parser de texto OCR: split_into_case_chunks y parse_arrendamiento_block sobre el corpus.
+
+Antes de medir se verifica que parse_arrendamiento_block dé exactamente los mismos
+registros que con la segmentación anterior (un finditer sobre block[:corte] por cada
+caso, copiada abajo como referencia); si difieren, la corrida falla.
+
+    python benchmarks/bench_texto.py
+    python benchmarks/bench_texto.py --corpus "revision_boletin*.txt"
+"""
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.comun import Caso, importar
+from benchmarks.corpus import cargar_corpus
+
+GRUPO = "texto"
+
+
+# -----------------------------
+# Implementación anterior (referencia)
+# -----------------------------
+class OffsetsAnterior:
+    """Segmentación antes de _Offsets: se vuelve a escanear el prefijo en cada caso."""
+
+    def __init__(self, regex, block: str):
+        self.regex = regex
+        self.block = block
+
+    def ultimo_antes(self, corte: int):
+        ultimo = None
+        for m in self.regex.finditer(self.block[:corte]):
+            ultimo = m
+        return ultimo
+
+    def primero_desde(self, pos: int):
+        return self.regex.search(self.block, pos)
+
+
+@contextmanager
+def _segmentacion_anterior(te):
+    actual = te._Offsets
+    te._Offsets = OffsetsAnterior
+    try:
+        yield
+    finally:
+        te._Offsets = actual
+
+
+def verificar(te, bloques) -> int:
+    """Compara registro por registro contra la referencia; regresa cuántos bloques revisó."""
+    bloques = list(bloques)
+    nuevos = [te.parse_arrendamiento_block(b, "2026-01-09", 3, n) for n, b in enumerate(bloques, start=3)]
+    with _segmentacion_anterior(te):
+        anteriores = [te.parse_arrendamiento_block(b, "2026-01-09", 3, n) for n, b in enumerate(bloques, start=3)]
+    for bloque, nuevo, anterior in zip(bloques, nuevos, anteriores):
+        if nuevo != anterior:
+            raise AssertionError(
+                f"parse_arrendamiento_block: {len(nuevo)} registros contra {len(anterior)} "
+                f"de la referencia para {bloque[:80]!r}"
+            )
+    return len(bloques)
+
+
+def casos(corpus: str | None = None) -> list[Caso]:
+    te = importar("text_extractor")
+    paginas = cargar_corpus(corpus)
+
+    # Un caso por bloque: el costo fijo por llamada (normalización + búsquedas)
+    trozos = [c for p in paginas for c in te.split_into_case_chunks(p)]
+
+    # Mismos registros que la referencia, por página completa y por caso
+    verificar(te, paginas)
+    verificar(te, trozos)
+
+    # Bloques tal como los arma pipeline: páginas completas (muchos casos juntos)
+    def parsear_paginas():
+        for n, pagina in enumerate(paginas, start=3):
+            te.parse_arrendamiento_block(pagina, "2026-01-09", 3, n)
+
+    def partir_casos():
+        for pagina in paginas:
+            te.split_into_case_chunks(pagina)
+
+    def parsear_trozos():
+        for trozo in trozos:
+            te.parse_arrendamiento_block(trozo, "2026-01-09", 3, 3)
+
+    return [
+        Caso("parse_arrendamiento_block[pagina]", parsear_paginas, len(paginas), "página"),
+        Caso("parse_arrendamiento_block[caso]", parsear_trozos, len(trozos), "caso"),
+        Caso("split_into_case_chunks", partir_casos, len(paginas), "página"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="glob de transcripciones revision_boletin*.txt")
+    args = parser.parse_args()
+
+    te = importar("text_extractor")
+    paginas = cargar_corpus(args.corpus)
+    trozos = [c for p in paginas for c in te.split_into_case_chunks(p)]
+    print(f"{verificar(te, paginas)} páginas y {verificar(te, trozos)} casos: mismos registros que la referencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import importlib
+import os
+import sys
+from dataclasses import dataclass
+from typing import Callable
+
+# La raíz del repo en el path para importar los módulos del scraper (son planos, no paquete)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+class Omitido(Exception):
+    # Falta una dependencia (cv2, PIL, tesseract, ...): el grupo se salta sin fallar la corrida
+    pass
+
+
+@dataclass
+class Caso:
+    nombre: str
+    funcion: Callable[[], object]
+    elementos: int = 1          # páginas / filas / imágenes por llamada
+    unidad: str = "llamada"
+    preparar: Callable[[], object] | None = None   # se corre antes de cada repetición, fuera del tiempo
+
+
+def requiere(*modulos: str) -> None:
+    faltantes = []
+    for nombre in modulos:
+        try:
+            importlib.import_module(nombre)
+        except ImportError:
+            faltantes.append(nombre)
+    if faltantes:
+        raise Omitido(f"faltan dependencias: {', '.join(faltantes)}")
+
+
+def importar(nombre: str):
+    # Importa un módulo del repo; si una dependencia suya no está instalada, se omite el grupo
+    try:
+        return importlib.import_module(nombre)
+    except ImportError as e:
+        raise Omitido(f"no se pudo importar {nombre}: {e}") from e
+    except FileNotFoundError as e:
+        # configuration.py exige config.env
+        raise Omitido(str(e)) from e
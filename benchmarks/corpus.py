@@ -0,0 +1,90 @@
+import glob
+import random
+import re
+
+# Corpus de texto OCR para los benchmarks.
+# - Si se pasan transcripciones grabadas (revision_boletin*.txt, modo debug) se usan esas.
+# - Si no, se genera un corpus sintético determinista con la misma forma que el OCR
+#   de las páginas en columnas (encabezados, casos "Actor vs. Demandado Tipo Exp Acdo.").
+
+RE_SEPARADOR_PAGINA = re.compile(r"\n=+\nPágina \d+\n=+\n")
+
+_NOMBRES = [
+    "JUAN PÉREZ LÓPEZ", "MARÍA GUADALUPE HERNÁNDEZ", "BANCO MERCANTIL DEL NORTE, S.A.",
+    "INMOBILIARIA “LA PAZ”, S.A. DE C.V.", "JOSÉ LUIS MARTÍNEZ", "ROSA ELENA CASTAÑEDA",
+    "ADMINISTRADORA DE INMUEBLES ‘EL ROBLE’", "SUCESIÓN DE CARLOS RUIZ", "PATRICIA OCHOA NÚÑEZ",
+]
+
+_TIPOS = [
+    "Controv. de Arrendamiento", "Especial de Arrendamiento Oral", "Ejecutivo Mercantil",
+    "Ordinario Civil", "Especial Hipotecario", "Controv. de Arrendamiento",
+]
+
+_ESTATUS = ["Acdo.", "Acdos.", "Sent.", "Acuerdo", "Sentencia"]
+
+_ENCABEZADOS = [
+    "BOLETIN JUDICIAL No. 3 Viernes 9 de enero del 2026",
+    "ACUERDOS DEL TRIBUNAL SUPERIOR DE JUSTICIA 2026",
+    "PRIMERA SALA CIVIL 2026",
+    "lo. 3 Viernes 9 de enero de 2026",
+]
+
+
+def _expediente(rnd: random.Random) -> str:
+    forma = rnd.randint(0, 3)
+    num, anio, sec = rnd.randint(1, 2999), rnd.choice([2023, 2024, 2025]), rnd.randint(1, 12)
+    if forma == 0:
+        return f"T.Ap {num}/{anio}/{sec:03d}"
+    if forma == 1:
+        return f"T. Ap. {num}/{anio}/{sec:03d}"
+    if forma == 2:
+        return f"T. {num}/{anio}/{sec:03d}"
+    return f"{num}/{anio}"
+
+
+def _caso(rnd: random.Random) -> str:
+    actor = rnd.choice(_NOMBRES)
+    demandado = rnd.choice(_NOMBRES)
+    vs = rnd.choice(["vs.", "vs", "VS.", "vs .", "vs.."])
+    exps = " ".join(_expediente(rnd) for _ in range(rnd.randint(1, 3)))
+    # El OCR parte las líneas en lugares arbitrarios
+    texto = f"{actor} {vs} {demandado} {rnd.choice(_TIPOS)} {exps} {rnd.choice(_ESTATUS)}"
+    palabras = texto.split(" ")
+    lineas, actual = [], []
+    for p in palabras:
+        actual.append(p)
+        if rnd.random() < 0.25:
+            lineas.append(" ".join(actual))
+            actual = []
+    if actual:
+        lineas.append(" ".join(actual))
+    return "\n".join(lineas)
+
+
+def generar_pagina(rnd: random.Random, casos: int = 40) -> str:
+    partes = [rnd.choice(_ENCABEZADOS)]
+    partes.extend(_caso(rnd) for _ in range(casos))
+    return "\n".join(partes) + "\n"
+
+
+def corpus_sintetico(paginas: int = 30, semilla: int = 2026) -> list[str]:
+    rnd = random.Random(semilla)
+    return [generar_pagina(rnd) for _ in range(paginas)]
+
+
+def cargar_transcripciones(patron: str) -> list[str]:
+    # Formato de guardar_texto_incremental: bloques separados por "=== Página n ==="
+    paginas = []
+    for ruta in sorted(glob.glob(patron)):
+        with open(ruta, encoding="utf-8") as f:
+            contenido = f.read()
+        paginas.extend(p for p in RE_SEPARADOR_PAGINA.split(contenido) if p.strip())
+    return paginas
+
+
+def cargar_corpus(patron: str | None = None) -> list[str]:
+    if patron:
+        paginas = cargar_transcripciones(patron)
+        if paginas:
+            return paginas
+    return corpus_sintetico()
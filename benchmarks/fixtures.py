@@ -0,0 +1,116 @@
+import io
+import random
+
+from benchmarks.corpus import corpus_sintetico, _NOMBRES, _TIPOS, _expediente
+
+# Fixtures deterministas para los benchmarks (sin red):
+# HTML del listado /filtrar, JS del visor y páginas JPEG sintéticas a dos columnas.
+
+_MESES = ["ene.", "feb.", "mar.", "abr.", "may.", "jun.", "jul.", "ago.", "sep.", "oct.", "nov.", "dic."]
+
+
+def html_listado(filas: int = 250, semilla: int = 2026) -> str:
+    # Misma estructura que la respuesta de /filtrar: #MyTable con tbody y 3 columnas
+    rnd = random.Random(semilla)
+    partes = [
+        "<html><head><title>Boletín</title></head><body>",
+        "<form><input type='hidden' name='_token' value='token-de-prueba'></form>",
+        "<table id='MyTable' class='table'><thead><tr><th>#</th><th>Fecha</th><th>Boletín</th></tr></thead><tbody>",
+    ]
+    for i in range(filas):
+        dia = rnd.randint(1, 28)
+        mes = rnd.choice(_MESES)
+        anio = rnd.choice([2025, 2026])
+        clave = f"{rnd.getrandbits(64):016x}"
+        partes.append(
+            f"<tr><td>{i + 1}</td><td> {dia:02d}-{mes}-{anio} </td>"
+            f"<td><a href='https://consultabpj.poderjudicialcdmx.gob.mx:2096/externo/{clave}' "
+            f"title='Visualizar el archivo del boletín' target='_blank'><i class='fa fa-file'></i> Ver</a></td></tr>"
+        )
+    partes.append("</tbody></table></body></html>")
+    return "\n".join(partes)
+
+
+def js_visor(paginas: int = 378, token: str = "a1b2c3d4e5", id_num: str = "123456") -> str:
+    # Arreglo de páginas del visor, con la forma que espera extraer_paginas_js
+    base = "https://edigital.poderjudicialcdmx.gob.mx"
+    items = []
+    for n in range(1, paginas + 1):
+        items.append(
+            "{\n"
+            f'    src: "{base}/temporales/{token}/{id_num}_{n}-2.jpg",\n'
+            f'    thumb: "{base}/visor/thumb/{n}/{token}",\n'
+            f'    title: "Página {n}",\n'
+            f'    id: "{id_num}&&{n}"\n'
+            "}"
+        )
+    return "<script>\nvar paginas = [\n" + ",\n".join(items) + "\n];\n</script>"
+
+
+def _fuente(tam: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=tam)
+    except TypeError:
+        # Pillow < 10.1: solo la fuente bitmap fija
+        return ImageFont.load_default()
+
+
+def jpeg_dos_columnas(semilla: int = 2026, ancho: int = 1275, alto: int = 1650) -> bytes:
+    """Página sintética tipo boletín: encabezado + dos columnas de casos, en JPEG."""
+    from PIL import Image, ImageDraw
+
+    rnd = random.Random(semilla)
+    img = Image.new("L", (ancho, alto), 255)
+    dibujo = ImageDraw.Draw(img)
+    fuente = _fuente(18)
+
+    dibujo.text((ancho // 2 - 200, 40), "BOLETIN JUDICIAL No. 3 Viernes 9 de enero de 2026", fill=0, font=fuente)
+
+    margen, gutter, y0 = 70, 40, 110
+    ancho_col = (ancho - 2 * margen - gutter) // 2
+    for col in range(2):
+        x = margen + col * (ancho_col + gutter)
+        y = y0
+        while y < alto - 80:
+            lineas = [
+                f"{rnd.choice(_NOMBRES)[:30]} vs.",
+                f"{rnd.choice(_NOMBRES)[:30]}",
+                f"{rnd.choice(_TIPOS)} {_expediente(rnd)} Acdo.",
+            ]
+            for linea in lineas:
+                dibujo.text((x, y), linea, fill=0, font=fuente)
+                y += 24
+            y += 10
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def expedientes_sinteticos(cantidad: int = 5000, semilla: int = 2026) -> list[dict]:
+    from datetime import date
+
+    rnd = random.Random(semilla)
+    return [
+        {
+            "id_expediente": _expediente(rnd),
+            "actor_demandante": rnd.choice(_NOMBRES),
+            "demandado": rnd.choice(_NOMBRES),
+            "tipo_juicio": rnd.choice(_TIPOS),
+            "fecha_publicacion": date(2026, 1, rnd.randint(1, 28)),
+            "numero_boletin": rnd.randint(1, 20),
+            "numero_pagina": rnd.randint(3, 380),
+            "estatus": rnd.choice(["Acdo", "Sent"]),
+        }
+        for _ in range(cantidad)
+    ]
+
+
+__all__ = [
+    "corpus_sintetico",
+    "html_listado",
+    "js_visor",
+    "jpeg_dos_columnas",
+    "expedientes_sinteticos",
+]
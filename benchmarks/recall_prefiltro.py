@@ -0,0 +1,82 @@
+"""
+Recall del prefiltro (prefiltro.py) contra el OCR completo por columnas, sin red:
+recorre las imágenes guardadas en el archivo local (ARCHIVO_DIR/*.pack).
+
+    python -m benchmarks.recall_prefiltro
+    python -m benchmarks.recall_prefiltro --archivo archivo --desde 3 --escala 0.5
+
+Una página "tiene arrendamiento" si el OCR completo encuentra RE_ARR; el prefiltro
+acierta si la deja pasar. Ambos OCR pasan por la caché, así que repetir es barato.
+"""
+import argparse
+import glob
+import os
+import time
+from dataclasses import replace
+
+from benchmarks.comun import RAIZ  # noqa: F401  (raíz del repo en sys.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archivo", help="carpeta con los .pack (por defecto ARCHIVO_DIR)")
+    parser.add_argument("--desde", type=int, default=2, help="primera página a evaluar")
+    parser.add_argument("--escala", type=float, help="PREFILTRO_ESCALA a probar")
+    args = parser.parse_args()
+
+    import configuration
+    import prefiltro
+    from archivo_paginas import ArchivoBoletin
+    from images import ocr_pagina_columna
+    from text_extractor import RE_ARR
+
+    if args.escala:
+        # Solo para esta corrida: la escala entra en la clave de caché del prefiltro
+        prefiltro.settings = replace(configuration.settings, prefiltro_escala=args.escala)
+
+    carpeta = args.archivo or configuration.settings.archivo_dir
+    conteo = {"vp": 0, "fn": 0, "fp": 0, "vn": 0}
+    t_prefiltro = t_completo = 0.0
+    perdidas = []
+
+    for ruta in sorted(glob.glob(os.path.join(carpeta, "*.pack"))):
+        fecha = os.path.basename(ruta)[:-len(".pack")]
+        archivo = ArchivoBoletin(fecha, carpeta)
+        try:
+            for pagina in archivo.paginas():
+                if pagina < args.desde:
+                    continue
+                contenido = archivo.leer(pagina)
+
+                inicio = time.perf_counter()
+                pasa = prefiltro.RE_ARR_APROX.search(prefiltro.texto_prefiltro(contenido)) is not None
+                t_prefiltro += time.perf_counter() - inicio
+
+                inicio = time.perf_counter()
+                tiene = RE_ARR.search(ocr_pagina_columna(contenido, pagina)) is not None
+                t_completo += time.perf_counter() - inicio
+
+                clave = ("vp" if pasa else "fn") if tiene else ("fp" if pasa else "vn")
+                conteo[clave] += 1
+                if clave == "fn":
+                    perdidas.append(f"{fecha}#{pagina}")
+        finally:
+            archivo.cerrar()
+
+    total = sum(conteo.values())
+    if not total:
+        print(f"No hay páginas archivadas en {carpeta}")
+        return
+
+    recall = prefiltro.recall({f"prefiltro_{k}": v for k, v in conteo.items()})
+    pasan = conteo["vp"] + conteo["fp"]
+    print(f"Páginas: {total}  {conteo}")
+    print(f"Recall: {recall}  (páginas con arrendamiento perdidas: {conteo['fn']})")
+    print(f"Pasan el prefiltro: {pasan} ({pasan / total:.1%}) -> OCR completo evitado en {total - pasan}")
+    print(f"Tiempo (con caché): prefiltro {t_prefiltro:.1f}s, OCR completo {t_completo:.1f}s")
+    for p in perdidas[:20]:
+        print("  perdida:", p)
+
+
+if __name__ == "__main__":
+    main()
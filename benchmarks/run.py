@@ -0,0 +1,172 @@
+"""
+Corre los benchmarks (sin red) y guarda los tiempos en JSON para comparar entre commits.
+
+    python -m benchmarks.run                      # todos los grupos, compara con la corrida anterior
+    python -m benchmarks.run --grupos texto html  # solo algunos grupos
+    python -m benchmarks.run --contra benchmarks/resultados/<archivo>.json
+    python -m benchmarks.run --corpus "revision_boletin*.txt"   # texto OCR grabado en vez del sintético
+
+Los grupos cuyas dependencias no están instaladas (cv2, PIL, tesseract, sqlalchemy...)
+se omiten con aviso. Los resultados quedan en benchmarks/resultados/<fecha>-<commit>.json.
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+
+from benchmarks.comun import RAIZ, Omitido
+
+MODULOS = [
+    "benchmarks.bench_normalizacion",
+    "benchmarks.bench_texto",
+    "benchmarks.bench_html",
+    "benchmarks.bench_imagenes",
+    "benchmarks.bench_db",
+]
+
+DIR_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+# Diferencia de la mediana a partir de la cual se marca regresión / mejora
+UMBRAL = 0.10
+
+
+def commit_actual() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        sucio = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        return f"{sha}-sucio" if sucio else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def medir(caso, repeticiones: int) -> dict:
+    # Una llamada de calentamiento (cachés de regex, imports perezosos, fuentes...)
+    if caso.preparar:
+        caso.preparar()
+    caso.funcion()
+
+    tiempos = timeit.repeat(
+        caso.funcion,
+        setup=caso.preparar or "pass",
+        number=1,
+        repeat=repeticiones,
+    )
+    mediana = statistics.median(tiempos)
+    return {
+        "minimo_s": min(tiempos),
+        "mediana_s": mediana,
+        "repeticiones": repeticiones,
+        "elementos": caso.elementos,
+        "unidad": caso.unidad,
+        "ms_por_elemento": round(mediana * 1000 / max(caso.elementos, 1), 4),
+    }
+
+
+def ejecutar(grupos: list[str] | None, repeticiones: int, corpus: str | None) -> tuple[dict, dict]:
+    resultados, omitidos = {}, {}
+    for nombre_modulo in MODULOS:
+        modulo = importlib.import_module(nombre_modulo)
+        grupo = modulo.GRUPO
+        if grupos and grupo not in grupos:
+            continue
+
+        print(f"[{grupo}]")
+        try:
+            lista = modulo.casos(corpus)
+        except Omitido as e:
+            print(f"  omitido: {e}")
+            omitidos[grupo] = str(e)
+            continue
+
+        for caso in lista:
+            r = medir(caso, repeticiones)
+            resultados[f"{grupo}/{caso.nombre}"] = r
+            print(f"  {caso.nombre:<38} mediana {r['mediana_s'] * 1000:>10.3f} ms"
+                  f"  ({r['ms_por_elemento']:.4f} ms/{caso.unidad})")
+    return resultados, omitidos
+
+
+def ultimo_resultado(excluir: str | None = None) -> str | None:
+    rutas = sorted(glob.glob(os.path.join(DIR_RESULTADOS, "*.json")))
+    rutas = [r for r in rutas if r != excluir]
+    return rutas[-1] if rutas else None
+
+
+def comparar(actual: dict, anterior: dict, umbral: float = UMBRAL) -> list[str]:
+    """Compara medianas caso por caso; regresa los casos que empeoraron más del umbral."""
+    regresiones = []
+    for clave, r in actual.items():
+        previo = anterior.get(clave)
+        if not previo or not previo.get("mediana_s"):
+            continue
+        cambio = r["mediana_s"] / previo["mediana_s"] - 1
+        marca = ""
+        if cambio > umbral:
+            marca = "  <-- REGRESIÓN"
+            regresiones.append(clave)
+        elif cambio < -umbral:
+            marca = "  (mejora)"
+        print(f"  {clave:<48} {previo['mediana_s'] * 1000:>10.3f} -> {r['mediana_s'] * 1000:>10.3f} ms"
+              f"  {cambio:+.1%}{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grupos", nargs="*", help="normalizacion texto html imagenes db")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--corpus", help="glob de transcripciones revision_boletin*.txt")
+    parser.add_argument("--contra", help="JSON de una corrida anterior (por defecto la más reciente)")
+    parser.add_argument("--umbral", type=float, default=UMBRAL)
+    parser.add_argument("--no-guardar", action="store_true", help="no escribe el JSON de esta corrida")
+    parser.add_argument("--estricto", action="store_true", help="código de salida 1 si hay regresiones")
+    args = parser.parse_args()
+
+    resultados, omitidos = ejecutar(args.grupos, args.repeticiones, args.corpus)
+
+    commit = commit_actual()
+    salida = {
+        "commit": commit,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "corpus": args.corpus or "sintetico",
+        "omitidos": omitidos,
+        "resultados": resultados,
+    }
+
+    ruta_anterior = args.contra or ultimo_resultado()
+    regresiones = []
+    if ruta_anterior:
+        with open(ruta_anterior, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"\nComparación contra {anterior.get('commit')} ({os.path.basename(ruta_anterior)}):")
+        regresiones = comparar(resultados, anterior.get("resultados", {}), args.umbral)
+
+    if not args.no_guardar:
+        os.makedirs(DIR_RESULTADOS, exist_ok=True)
+        nombre = f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+        ruta = os.path.join(DIR_RESULTADOS, nombre)
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(salida, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados en {ruta}")
+
+    if regresiones and args.estricto:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
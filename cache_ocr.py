@@ -0,0 +1,180 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from configuration import settings
+from ocr import firma_ocr
+from telemetria import contar, totales
+
+# Caché persistente de resultados OCR (SQLite).
+# Clave = sha256 de los bytes de la imagen + variante de preprocesado + config de tesseract.
+# - El total de bytes se lleva en ocr_cache_total (una fila, al día por triggers): revisar el
+#   límite en cada inserción no recorre la tabla.
+# - Aciertos y fallos son telemetría (etapas ocr_cache_hit / ocr_cache_miss, con los segundos
+#   de OCR ahorrados en la de hit): viajan con el resultado de cada tarea del pool y no
+#   escriben en la base en cada consulta.
+# Las páginas completas guardan además la escala OCR elegida y la altura de letra medida,
+# para que un acierto de la caché también las entregue (ver images.ocr_pagina).
+
+SQL_CREAR = """
+create table if not exists ocr_cache (
+    clave text primary key,
+    texto text not null,
+    tamano integer not null,
+    segundos_ocr real not null,
+    ultimo_acceso real not null,
+    escala real,
+    altura real
+);
+create index if not exists ix_ocr_cache_acceso on ocr_cache (ultimo_acceso);
+create table if not exists ocr_cache_total (
+    id integer primary key check (id = 1),
+    bytes integer not null
+);
+insert or ignore into ocr_cache_total (id, bytes) select 1, coalesce(sum(tamano), 0) from ocr_cache;
+create trigger if not exists tr_ocr_cache_insertar after insert on ocr_cache begin
+    update ocr_cache_total set bytes = bytes + new.tamano where id = 1;
+end;
+create trigger if not exists tr_ocr_cache_actualizar after update of tamano on ocr_cache begin
+    update ocr_cache_total set bytes = bytes - old.tamano + new.tamano where id = 1;
+end;
+create trigger if not exists tr_ocr_cache_borrar after delete on ocr_cache begin
+    update ocr_cache_total set bytes = bytes - old.tamano where id = 1;
+end;
+"""
+
+# Al pasar el límite se evicta hasta esta fracción, para no evictar en cada inserción
+FRACCION_EVICCION = 0.9
+
+# Una conexión por hilo y por proceso (las conexiones sqlite no sobreviven a un fork)
+_local = threading.local()
+
+
+def _conexion() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        ruta = settings.ocr_cache_ruta
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        conn.execute("pragma journal_mode=wal")
+        # En una transacción: el total inicial y los triggers aparecen juntos para todos los procesos
+        conn.executescript(f"begin immediate;\n{SQL_CREAR}\ncommit;")
+        _migrar(conn)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _migrar(conn) -> None:
+    # Cachés creadas antes de guardar la escala: se agregan las columnas (quedan en null)
+    columnas = {fila[1] for fila in conn.execute("pragma table_info(ocr_cache)")}
+    for columna in ("escala", "altura"):
+        if columna not in columnas:
+            try:
+                conn.execute(f"alter table ocr_cache add column {columna} real")
+            except sqlite3.OperationalError:
+                # otro proceso del pool la agregó primero
+                pass
+
+
+def clave_ocr(contenido: bytes, variante: str) -> str:
+    digest = hashlib.sha256(contenido).hexdigest()
+    return f"{digest}|{variante}|{firma_ocr()}"
+
+
+def obtener(clave: str) -> tuple[str, tuple | None] | None:
+    # (texto, (escala, altura) o None si no se guardó) o None si no está
+    conn = _conexion()
+    fila = conn.execute(
+        "select texto, segundos_ocr, escala, altura from ocr_cache where clave = ?", (clave,)
+    ).fetchone()
+
+    if fila is None:
+        contar("ocr_cache_miss")
+        return None
+
+    texto, segundos, escala, altura = fila
+    conn.execute("update ocr_cache set ultimo_acceso = ? where clave = ?", (time.time(), clave))
+    contar("ocr_cache_hit", segundos=segundos)
+    return texto, ((escala, altura) if escala is not None else None)
+
+
+def guardar(clave: str, texto: str, segundos_ocr: float, escala: tuple | None = None) -> None:
+    conn = _conexion()
+    escala, altura = escala if escala is not None else (None, None)
+    conn.execute(
+        """
+        insert into ocr_cache (clave, texto, tamano, segundos_ocr, ultimo_acceso, escala, altura)
+        values (?, ?, ?, ?, ?, ?, ?)
+        on conflict(clave) do update set
+            texto = excluded.texto, tamano = excluded.tamano, segundos_ocr = excluded.segundos_ocr,
+            ultimo_acceso = excluded.ultimo_acceso, escala = excluded.escala, altura = excluded.altura
+        """,
+        (clave, texto, len(texto.encode("utf-8")), segundos_ocr, time.time(), escala, altura),
+    )
+    _evictar(conn)
+
+
+def _total(conn) -> int:
+    return conn.execute("select bytes from ocr_cache_total where id = 1").fetchone()[0]
+
+
+def _evictar(conn) -> None:
+    # LRU por tamaño: al pasar el límite configurado conserva las entradas más recientes
+    # hasta FRACCION_EVICCION del límite
+    limite = settings.ocr_cache_max_mb * 1024 * 1024
+    if _total(conn) <= limite:
+        return
+
+    conn.execute(
+        """
+        delete from ocr_cache where clave in (
+            select clave from (
+                select clave, sum(tamano) over (order by ultimo_acceso desc) as acumulado
+                from ocr_cache
+            ) where acumulado > ?
+        )
+        """,
+        (int(limite * FRACCION_EVICCION),),
+    )
+
+
+def ocr_con_cache(contenido: bytes, variante: str, calcular, con_escala: bool = False):
+    """
+    Regresa el texto OCR de la imagen desde la caché o, si no está, ejecuta calcular()
+    y guarda el resultado.
+    con_escala=True: calcular() regresa (texto, escala) y se regresa igual; la escala
+    ((escala, altura) o None) se guarda con el texto y vuelve en los aciertos.
+    """
+    if not settings.ocr_cache_activo:
+        return calcular()
+
+    clave = clave_ocr(contenido, variante)
+    guardado = obtener(clave)
+    if guardado is not None:
+        texto, escala = guardado
+        return (texto, escala) if con_escala else texto
+
+    inicio = time.perf_counter()
+    resultado = calcular()
+    texto, escala = resultado if con_escala else (resultado, None)
+    guardar(clave, texto, time.perf_counter() - inicio, escala)
+    return resultado
+
+
+def estadisticas() -> dict:
+    # Aciertos y fallos de esta corrida (telemetría, incluye los workers); tamaño de la caché
+    etapas = totales()
+    conn = _conexion()
+    entradas = conn.execute("select count(*) from ocr_cache").fetchone()[0]
+    return {
+        "hits": etapas.get("ocr_cache_hit", {}).get("llamadas", 0),
+        "misses": etapas.get("ocr_cache_miss", {}).get("llamadas", 0),
+        "segundos_ahorrados": round(etapas.get("ocr_cache_hit", {}).get("segundos", 0.0), 2),
+        "entradas": entradas,
+        "bytes": _total(conn),
+    }
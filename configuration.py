@@ -8,10 +8,10 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 ENV_PATH = BASE_DIR / "config.env"
 
-if not ENV_PATH.exists():
-    raise FileNotFoundError(f"No existe el archivo .env en: {ENV_PATH}")
-
-load_dotenv(dotenv_path=ENV_PATH)
+# Sin config.env se usan las variables de entorno y los valores por defecto; lo que
+# sí es obligatorio (credenciales de la base) lo revisa db.py al crear el engine
+if ENV_PATH.exists():
+    load_dotenv(dotenv_path=ENV_PATH)
 # Carga .env automáticamente (si existe)
 #load_dotenv()
 
@@ -30,6 +30,21 @@ def get_int(key: str, default: int | None = None, *, required: bool = False) ->
     except ValueError as e:
         raise ValueError(f"Variable {key} debe ser entero. Valor actual: {val}") from e
 
+def get_float(key: str, default: float | None = None, *, required: bool = False) -> float | None:
+    val = get_env(key, None, required=required)
+    if val is None or val == "":
+        return default
+    try:
+        return float(val)
+    except ValueError as e:
+        raise ValueError(f"Variable {key} debe ser numérica. Valor actual: {val}") from e
+
+def get_bool(key: str, default: bool = False) -> bool:
+    val = get_env(key, None)
+    if val is None or val == "":
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "y", "si", "sí")
+
 @dataclass(frozen=True)
 class Settings:
     # DB
@@ -48,15 +63,96 @@ class Settings:
     fecha_ini:str
     fecha_fin:str
     is_debbug:bool
+    volcar_imagenes: bool
+    transcripcion_comprimida: bool
+
+    # Pipeline por página (descarga -> OCR -> parseo)
+    pipeline_activo: bool
+    hilos_descarga: int
+    procesos_ocr: int
+    tam_cola: int
+
+    # OCR
+    ocr_backend: str
+    ocr_lang: str
+    ocr_psm: int
+    ocr_oem: int
+    ocr_tessdata: str
+    tesseract_cmd: str
+    ocr_resolucion: str
+    ocr_altura_objetivo: float
+    ocr_escala_min: float
+    ocr_escala_max: float
+
+    # Caché de resultados OCR
+    ocr_cache_activo: bool
+    ocr_cache_ruta: str
+    ocr_cache_max_mb: int
+
+    # Archivo local de imágenes de los boletines
+    archivo_activo: bool
+    archivo_dir: str
+
+    # Cliente HTTP
+    http_max_conexiones_host: int
+    http_timeout: int
+
+    # Planificador de boletines
+    boletines_concurrentes: int
+    prioridad_boletines: str
+    host_imagenes: str
+    tasa_portal: float
+    tasa_imagenes: float
+    tasa_rafaga: int
+
+    # Checkpoint por página
+    checkpoint_paginas: int
+    reanudar: bool
+    cache_procesados: bool
+
+    # Índice de dedup de expedientes (páginas, boletines y corridas)
+    dedup_activo: bool
+
+    # Almacén del texto OCR por boletín (para re-parsear sin OCR)
+    textos_ocr_activo: bool
+    textos_ocr_dir: str
+
+    # Layout de las páginas en columnas
+    columnas_ocr: int
+    hilos_ocr_columnas: int
+
+    # Prefiltro barato antes del OCR completo de las columnas
+    prefiltro_activo: bool
+    prefiltro_escala: float
+    prefiltro_medir: bool
+
+    # Plan de páginas por secciones del índice
+    planear_paginas: bool
+    secciones_incluidas: tuple[str, ...]
+    secciones_excluidas: tuple[str, ...]
+
+    # Descarga directa de imágenes (sin el thumb)
+    url_directa: bool
+    tam_imagen: int
+
+    # Descubrimiento de boletines por ventanas de fechas
+    descubrimiento_ventana: str
+    descubrimiento_concurrencia: int
+    descubrimiento_reintentos: int
+
+    # Telemetría por etapa
+    telemetria_activa: bool
+    telemetria_resumen: str
+    telemetria_prometheus: str
 
 def load_settings() -> Settings:
     return Settings(
         db_backend=(get_env("DB_BACKEND", "postgres") or "postgres").lower(),
         db_host=get_env("DB_HOST", "localhost") or "localhost",
         db_port=get_int("DB_PORT", 5432) or 5432,
-        db_name=get_env("DB_NAME", required=True) or "",
-        db_user=get_env("DB_USER", required=True) or "",
-        db_password=get_env("DB_PASSWORD", required=True) or "",
+        db_name=get_env("DB_NAME", "") or "",
+        db_user=get_env("DB_USER", "") or "",
+        db_password=get_env("DB_PASSWORD", "") or "",
         #Ejemplo de obtencion de llaves
         url_boletin=get_env("URL_BOLETIN", "") or "",
         app_env=get_env("APP_ENV", "dev") or "dev",
@@ -64,7 +160,58 @@ def load_settings() -> Settings:
         url_boletin_filtro=get_env("URL_BOLETIN_FILTRO", "") or "",
         fecha_ini=get_env("FILTRADO_INI","") or "",
         fecha_fin=get_env("FILTRADO_FIN","") or "",
-        is_debbug=get_env("ISDEBBUG",False) or False,
+        is_debbug=get_bool("ISDEBBUG", False),
+        volcar_imagenes=get_bool("VOLCAR_IMAGENES_DEBUG", False),
+        transcripcion_comprimida=get_bool("TRANSCRIPCION_COMPRIMIDA", False),
+        pipeline_activo=get_bool("PIPELINE_ACTIVO", False),
+        hilos_descarga=get_int("PIPELINE_HILOS_DESCARGA", 8) or 8,
+        procesos_ocr=get_int("PIPELINE_PROCESOS_OCR", os.cpu_count() or 1) or 1,
+        tam_cola=get_int("PIPELINE_TAM_COLA", 16) or 16,
+        ocr_backend=(get_env("OCR_BACKEND", "auto") or "auto").lower(),
+        ocr_lang=get_env("OCR_LANG", "spa+eng") or "spa+eng",
+        ocr_psm=get_int("OCR_PSM", 4) or 4,
+        ocr_oem=get_int("OCR_OEM", 3) or 3,
+        ocr_tessdata=get_env("OCR_TESSDATA", "") or "",
+        tesseract_cmd=get_env("TESSERACT_CMD", "/opt/homebrew/bin/tesseract") or "/opt/homebrew/bin/tesseract",
+        ocr_resolucion=(get_env("OCR_RESOLUCION", "fija") or "fija").lower(),
+        ocr_altura_objetivo=get_float("OCR_ALTURA_OBJETIVO", 22.0) or 22.0,
+        ocr_escala_min=get_float("OCR_ESCALA_MIN", 1.0) or 1.0,
+        ocr_escala_max=get_float("OCR_ESCALA_MAX", 2.5) or 2.5,
+        ocr_cache_activo=get_bool("OCR_CACHE_ACTIVO", True),
+        ocr_cache_ruta=get_env("OCR_CACHE_RUTA", "cache/ocr_cache.sqlite3") or "cache/ocr_cache.sqlite3",
+        ocr_cache_max_mb=get_int("OCR_CACHE_MAX_MB", 512) or 512,
+        archivo_activo=get_bool("ARCHIVO_ACTIVO", False),
+        archivo_dir=get_env("ARCHIVO_DIR", "archivo") or "archivo",
+        http_max_conexiones_host=get_int("HTTP_MAX_CONEXIONES_HOST", 16) or 16,
+        http_timeout=get_int("HTTP_TIMEOUT", 30) or 30,
+        boletines_concurrentes=get_int("BOLETINES_CONCURRENTES", 2) or 1,
+        prioridad_boletines=(get_env("PRIORIDAD_BOLETINES", "recientes") or "recientes").lower(),
+        host_imagenes=get_env("HOST_IMAGENES", "edigital.poderjudicialcdmx.gob.mx") or "",
+        tasa_portal=get_float("TASA_PORTAL", 2.0) or 0.0,
+        tasa_imagenes=get_float("TASA_IMAGENES", 10.0) or 0.0,
+        tasa_rafaga=get_int("TASA_RAFAGA", 5) or 1,
+        checkpoint_paginas=get_int("CHECKPOINT_PAGINAS", 10) or 1,
+        reanudar=get_bool("REANUDAR", True),
+        cache_procesados=get_bool("CACHE_PROCESADOS", False),
+        dedup_activo=get_bool("DEDUP_ACTIVO", True),
+        textos_ocr_activo=get_bool("TEXTOS_OCR_ACTIVO", False),
+        textos_ocr_dir=get_env("TEXTOS_OCR_DIR", "textos") or "textos",
+        columnas_ocr=get_int("COLUMNAS_OCR", 2) or 0,
+        hilos_ocr_columnas=get_int("HILOS_OCR_COLUMNAS", 2) or 1,
+        prefiltro_activo=get_bool("PREFILTRO_ACTIVO", False),
+        prefiltro_escala=get_float("PREFILTRO_ESCALA", 0.6) or 0.6,
+        prefiltro_medir=get_bool("PREFILTRO_MEDIR", False),
+        planear_paginas=get_bool("PLANEAR_PAGINAS", True),
+        secciones_incluidas=tuple(s.strip() for s in (get_env("SECCIONES_INCLUIDAS", "SALA,CIVIL,ARRENDAMIENTO") or "").split(",") if s.strip()),
+        secciones_excluidas=tuple(s.strip() for s in (get_env("SECCIONES_EXCLUIDAS", "") or "").split(",") if s.strip()),
+        url_directa=get_bool("URL_DIRECTA", False),
+        tam_imagen=get_int("TAM_IMAGEN", 2) or 2,
+        descubrimiento_ventana=(get_env("DESCUBRIMIENTO_VENTANA", "") or "").lower(),
+        descubrimiento_concurrencia=get_int("DESCUBRIMIENTO_CONCURRENCIA", 4) or 1,
+        descubrimiento_reintentos=get_int("DESCUBRIMIENTO_REINTENTOS", 3) or 0,
+        telemetria_activa=get_bool("TELEMETRIA_ACTIVA", True),
+        telemetria_resumen=get_env("TELEMETRIA_RESUMEN", "telemetria/boletines.jsonl") or "",
+        telemetria_prometheus=get_env("TELEMETRIA_PROMETHEUS", "") or "",
     )
 
 settings = load_settings()
@@ -1,10 +1,24 @@
 from __future__ import annotations
+import threading
 from urllib.parse import quote_plus
-from sqlalchemy import create_engine
 from configuration import settings
 
+# El engine se crea la primera vez que se usa (db.engine), no al importar:
+# los comandos que no tocan la base no necesitan sqlalchemy ni credenciales.
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def validar_credenciales() -> None:
+    for variable, valor in (("DB_NAME", settings.db_name), ("DB_USER", settings.db_user),
+                            ("DB_PASSWORD", settings.db_password)):
+        if not valor:
+            raise ValueError(f"Falta variable requerida: {variable}")
+
 
 def build_database_url() -> str:
+    validar_credenciales()
     backend = settings.db_backend.lower()
 
     if backend in ("postgres", "postgresql"):
@@ -37,10 +51,25 @@ def build_database_url() -> str:
     raise ValueError(f"DB_BACKEND no soportado: {backend}")
 
 
-DATABASE_URL = build_database_url()
+def obtener_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+
+                _engine = create_engine(
+                    build_database_url(),
+                    future=True,
+                    pool_pre_ping=True,
+                )
+    return _engine
+
 
-engine = create_engine(
-    DATABASE_URL,
-    future=True,
-    pool_pre_ping=True,
-)
+def __getattr__(nombre):
+    # db.engine / db.DATABASE_URL siguen funcionando, pero perezosos
+    if nombre == "engine":
+        return obtener_engine()
+    if nombre == "DATABASE_URL":
+        return build_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+
+from normalizacion import colapsar_espacios
+
+# Índice de expedientes ya cargados, compartido por todas las páginas y boletines de la corrida.
+# - Llave: (id_expediente, fecha_publicacion, numero_boletin, tipo_juicio, estatus) normalizada;
+#   el mismo expediente repetido en otra página del mismo boletín cuenta como duplicado.
+# - Se guarda solo un hash de 64 bits por llave (un int en un set, no la tupla de textos).
+#   Con 64 bits la probabilidad de una colisión es despreciable aun con millones de
+#   expedientes; un filtro de Bloom perdería expedientes reales por sus falsos positivos.
+# - Se precarga de la base para la ventana de fechas de la corrida (ver precargar) y
+#   descarta los registros repetidos antes de insertar_expedientes_bulk / guardar_avance.
+
+CAMPOS_LLAVE = ("id_expediente", "fecha_publicacion", "numero_boletin", "tipo_juicio", "estatus")
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return colapsar_espacios(str(valor)).casefold()
+
+
+def llave_expediente(reg: dict) -> tuple[str, ...]:
+    # "T. Ap 12/2024/001" y "T.Ap 12/2024/001" son el mismo expediente
+    id_expediente = "".join((reg.get("id_expediente") or "").split()).upper()
+    return (id_expediente, *(_texto(reg.get(c)) for c in CAMPOS_LLAVE[1:]))
+
+
+def hash_llave(llave: tuple[str, ...]) -> int:
+    digest = hashlib.blake2b("\x1f".join(llave).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class IndiceDedup:
+    """
+    Conjunto de hashes de llaves ya cargadas. Seguro entre hilos (los boletines
+    concurrentes del planificador comparten un solo índice).
+        nuevos, hashes = indice.filtrar(registros)
+        ... insertar nuevos ...
+        # si la inserción falla: indice.descartar(hashes)
+    """
+
+    def __init__(self):
+        self._hashes: set[int] = set()
+        self._lock = threading.Lock()
+        self.precargados = 0
+        self.suprimidos = 0
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def precargar(self, filas) -> int:
+        # filas: dicts (o mappings) con CAMPOS_LLAVE, p. ej. repository.llaves_expedientes
+        nuevos = {hash_llave(llave_expediente(f)) for f in filas}
+        with self._lock:
+            antes = len(self._hashes)
+            self._hashes |= nuevos
+            agregados = len(self._hashes) - antes
+            self.precargados += agregados
+        return agregados
+
+    def filtrar(self, registros: list[dict]) -> tuple[list[dict], list[int]]:
+        """
+        Regresa (registros nuevos en el mismo orden, hashes reservados para ellos).
+        Los nuevos quedan en el índice de inmediato: otro boletín que los traiga en
+        paralelo ya los ve como repetidos.
+        """
+        nuevos, reservados = [], []
+        with self._lock:
+            for reg in registros:
+                h = hash_llave(llave_expediente(reg))
+                if h in self._hashes:
+                    continue
+                self._hashes.add(h)
+                reservados.append(h)
+                nuevos.append(reg)
+            self.suprimidos += len(registros) - len(nuevos)
+        return nuevos, reservados
+
+    def descartar(self, hashes: list[int]) -> None:
+        # La inserción falló (rollback): esos registros no quedaron en la base
+        with self._lock:
+            self._hashes.difference_update(hashes)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"llaves": len(self._hashes), "precargadas": self.precargados, "suprimidos": self.suprimidos}
@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import httpx
+
+from configuration import settings
+from http_cliente import obtener_cliente, REINTENTOS_BACKOFF, REINTENTOS_BACKOFF_MAX
+from extractor_js import obtener_token_filtro, filtrar_boletines, iterar_externos, obtener_html_filtrado, extraer_externos
+
+# Descubrimiento de boletines por ventanas de fechas:
+# en vez de un solo POST a /filtrar por todo FILTRADO_INI..FILTRADO_FIN (lento, con
+# timeouts en rangos largos) se parte el rango en semanas o meses, se piden las ventanas
+# en paralelo con la misma sesión y el mismo _token, y cada ventana se reintenta sola.
+# Las ventanas que aun así fallan se vuelven a pedir una por una al final; las que siguen
+# fallando se regresan para que la CLI no dé la corrida por buena (listado incompleto).
+
+# Laravel responde 419 cuando el _token (CSRF) expiró: se pide uno nuevo y se reintenta
+ESTADO_TOKEN_EXPIRADO = 419
+
+
+def _a_fecha(valor) -> date:
+    return valor if isinstance(valor, date) else date.fromisoformat(valor)
+
+
+def _fin_de_mes(d: date) -> date:
+    siguiente = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+    return siguiente - timedelta(days=1)
+
+
+def ventanas_fechas(fecha_ini, fecha_fin, ventana: str = "mes") -> list[tuple[date, date]]:
+    """
+    Parte [fecha_ini, fecha_fin] (ambos inclusive) en ventanas contiguas sin traslape.
+    - semana: de lunes a domingo
+    - mes: mes calendario
+    La primera y la última ventana se recortan al rango pedido.
+    """
+    ini, fin = _a_fecha(fecha_ini), _a_fecha(fecha_fin)
+    if ventana not in ("semana", "mes"):
+        raise ValueError(f"DESCUBRIMIENTO_VENTANA no soportada: {ventana}")
+
+    ventanas = []
+    actual = ini
+    while actual <= fin:
+        if ventana == "semana":
+            corte = actual + timedelta(days=6 - actual.weekday())
+        else:
+            corte = _fin_de_mes(actual)
+        corte = min(corte, fin)
+        ventanas.append((actual, corte))
+        actual = corte + timedelta(days=1)
+    return ventanas
+
+
+class _Token:
+    # _token compartido por todas las ventanas; se renueva una sola vez por expiración
+    def __init__(self, sesion, url_base):
+        self._sesion = sesion
+        self._url_base = url_base
+        self._lock = threading.Lock()
+        self.valor = obtener_token_filtro(sesion, url_base)
+
+    def renovar(self, vencido: str) -> str:
+        with self._lock:
+            # Si otra ventana ya lo renovó, se usa ese
+            if self.valor == vencido:
+                self.valor = obtener_token_filtro(self._sesion, self._url_base)
+            return self.valor
+
+
+def _descargar_ventana(sesion, url, url_base, token: _Token, ini: date, fin: date, reintentos: int) -> str:
+    intento = 0
+    while True:
+        valor = token.valor
+        try:
+            r = filtrar_boletines(sesion, url, url_base, valor, ini.isoformat(), fin.isoformat())
+            if r.status_code == ESTADO_TOKEN_EXPIRADO:
+                token.renovar(valor)
+            r.raise_for_status()
+            return r.text
+        except httpx.HTTPError as e:
+            intento += 1
+            if intento > reintentos:
+                raise
+            espera = min(REINTENTOS_BACKOFF * (2 ** (intento - 1)), REINTENTOS_BACKOFF_MAX)
+            print(f"Ventana {ini}..{fin}: {e}; reintento {intento}/{reintentos} en {espera}s")
+            time.sleep(espera)
+
+
+def descubrir_externos(
+    url: str,
+    url_base: str,
+    fecha_ini,
+    fecha_fin,
+    ventana: str = "mes",
+    concurrencia: int = 4,
+    reintentos: int = 3,
+    convertir_a_date: bool = True,
+) -> tuple[list[tuple], list[tuple[date, date]]]:
+    """
+    Regresa (externos, fallidas):
+    - externos: la misma lista (fecha, url_externo) que extraer_externos(obtener_html_filtrado(...)),
+      sin duplicados (una url que aparezca en dos ventanas cuenta una vez), en el orden de las
+      ventanas y de las filas dentro de cada una.
+    - fallidas: rangos (ini, fin) que fallaron después de sus reintentos y de una última
+      pasada en serie; si no está vacía el listado está incompleto.
+    Una ventana que falla no detiene a las demás.
+    """
+    sesion = obtener_cliente()
+    token = _Token(sesion, url_base)
+    ventanas = ventanas_fechas(fecha_ini, fecha_fin, ventana)
+
+    def tarea(rango):
+        ini, fin = rango
+        html = _descargar_ventana(sesion, url, url_base, token, ini, fin, reintentos)
+        return list(iterar_externos(html, convertir_a_date))
+
+    resultados = {}
+    fallidas = []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrencia, len(ventanas))),
+                            thread_name_prefix="ventana") as pool:
+        futuros = [(rango, pool.submit(tarea, rango)) for rango in ventanas]
+        for (ini, fin), futuro in futuros:
+            try:
+                resultados[(ini, fin)] = futuro.result()
+            except Exception as e:
+                fallidas.append((ini, fin))
+                print(f"Error en la ventana {ini}..{fin}: {e}")
+
+    # Última pasada en serie (sin competir con las demás ventanas) para las que fallaron
+    pendientes = []
+    for ini, fin in fallidas:
+        try:
+            resultados[(ini, fin)] = tarea((ini, fin))
+            print(f"Ventana {ini}..{fin}: recuperada en la pasada final")
+        except Exception as e:
+            pendientes.append((ini, fin))
+            print(f"Error en la ventana {ini}..{fin} (pasada final): {e}")
+
+    externos = []
+    vistos = set()
+    for rango in ventanas:
+        for fecha, url_externo in resultados.get(rango, ()):
+            if url_externo in vistos:
+                continue
+            vistos.add(url_externo)
+            externos.append((fecha, url_externo))
+
+    print(f"Boletines encontrados: {len(externos)} en {len(ventanas)} ventanas ({len(pendientes)} fallidas)")
+    return externos, pendientes
+
+
+def descubrir_configurado(url: str, url_base: str) -> tuple[list[tuple], list[tuple[date, date]]]:
+    # Según DESCUBRIMIENTO_VENTANA (semana|mes): por ventanas; vacío: un solo POST por todo el
+    # rango (si falla, la excepción se propaga). Regresa (externos, ventanas fallidas)
+    if not settings.descubrimiento_ventana:
+        html = obtener_html_filtrado(url, url_base, settings.fecha_ini, settings.fecha_fin)
+        return extraer_externos(html, True), []
+
+    return descubrir_externos(
+        url, url_base, settings.fecha_ini, settings.fecha_fin,
+        ventana=settings.descubrimiento_ventana,
+        concurrencia=settings.descubrimiento_concurrencia,
+        reintentos=settings.descubrimiento_reintentos,
+    )
@@ -1,9 +1,9 @@
 import re
 from urllib.parse import urlparse
-import requests
-from bs4 import BeautifulSoup
 from datetime import date
-import unicodedata
+from normalizacion import normalizar_fechas
+from http_cliente import obtener_cliente
+from telemetria import etapa
 
 MESES_ES = {
     "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
@@ -18,108 +18,274 @@ def parse_fecha_boletin(s: str) -> date:
 
 
 def obtener_html(URL):
-    r = requests.get(URL, timeout=30)
+    with etapa("listado") as m:
+        r = obtener_cliente().get(URL, timeout=30)
+        m.bytes = len(r.content)
     print(r.status_code, r.headers.get("Allow"))#r.raise_for_status()
     return r.text
 
-def obtener_html_filtrado(URL,URL_BASE,fecha_ini="2025-12-01", fecha_fin="2026-01-31"):
-    s = requests.Session()
-
-    # 1) GET para obtener cookies y el token
-    r = s.get(URL_BASE, timeout=30)
+def obtener_token_filtro(s, URL_BASE):
+    # GET a la página del buscador: deja las cookies de sesión en el cliente y regresa el _token (CSRF)
+    with etapa("listado") as m:
+        r = s.get(URL_BASE, timeout=30)
+        m.bytes = len(r.content)
     r.raise_for_status()
 
+    from bs4 import BeautifulSoup  # solo aquí; el resto del módulo usa lxml en streaming
+
     soup = BeautifulSoup(r.text, "html.parser")
-    token = soup.select_one("input[name='_token']")["value"]
+    return soup.select_one("input[name='_token']")["value"]
 
-    # 2) POST con token y fechas
+def filtrar_boletines(s, URL, URL_BASE, token, fecha_ini, fecha_fin, timeout=60):
+    # POST con token y fechas; regresa la respuesta sin revisar el status
     payload = {
         "_token": token,
         "fechainicial": fecha_ini,
         "fechafinal": fecha_fin
     }
 
-    r2 = s.post(URL, data=payload, headers={"Referer": URL_BASE}, timeout=60)
+    with etapa("listado") as m:
+        r = s.post(URL, data=payload, headers={"Referer": URL_BASE}, timeout=timeout)
+        m.bytes = len(r.content)
+    return r
+
+def obtener_html_filtrado(URL,URL_BASE,fecha_ini="2025-12-01", fecha_fin="2026-01-31"):
+    # Cliente compartido: guarda las cookies de la sesión del portal
+    s = obtener_cliente()
+
+    # 1) GET para obtener cookies y el token
+    token = obtener_token_filtro(s, URL_BASE)
+
+    # 2) POST con token y fechas
+    r2 = filtrar_boletines(s, URL, URL_BASE, token, fecha_ini, fecha_fin)
     r2.raise_for_status()
     return r2.text
 
+# -----------------------------
+# Listado de boletines (/filtrar) en streaming
+# -----------------------------
+# lxml con target: el parser solo emite eventos start/end/data, no arma árbol.
+# Cada <tr> se reduce a sus celdas (texto + <a>) y se entrega en cuanto cierra;
+# en memoria solo vive la fila en curso.
+
+TAM_TROZO_HTML = 64 * 1024
+
+
+class _Celda:
+    __slots__ = ("textos", "links")
+
+    def __init__(self):
+        self.textos = []
+        self.links = []     # atributos de cada <a>, en orden de aparición
+
+    def texto(self) -> str:
+        # Igual que get_text(" ", strip=True) de BeautifulSoup
+        return " ".join(t for t in (x.strip() for x in self.textos) if t)
+
+
+class _Fila:
+    __slots__ = ("en_tabla", "celdas")
+
+    def __init__(self, en_tabla: bool):
+        self.en_tabla = en_tabla    # dentro de #MyTable tbody
+        self.celdas = []
+
+
+class _EventosListado:
+    """
+    Target de lxml.etree.HTMLParser. Junta en `listas` las filas completas (solo el <tr>
+    más externo; tablas anidadas quedan dentro de su celda) y en `links` los atributos
+    de todos los <a> del documento.
+    """
+
+    def __init__(self):
+        self.listas = []
+        self.links = []
+        self._texto = []
+        self._pila = []           # (tag, id) abiertos fuera de las filas
+        self._fila = None
+        self._celda = None
+        self._prof_fila = 0       # <tr> anidados dentro de la fila actual
+        self._prof_celda = 0      # <td> anidados dentro de la celda actual
+
+    def _vaciar_texto(self):
+        # lxml puede partir un nodo de texto en varios eventos data(): se une antes de guardarlo
+        if self._texto:
+            if self._celda is not None:
+                self._celda.textos.append("".join(self._texto))
+            self._texto = []
+
+    def _en_tabla(self) -> bool:
+        dentro_tabla = False
+        for tag, id_ in self._pila:
+            if id_ == "MyTable":
+                dentro_tabla = True
+            elif dentro_tabla and tag == "tbody":
+                return True
+        return False
+
+    def start(self, tag, attrib):
+        self._vaciar_texto()
+
+        if tag == "a":
+            attrs = dict(attrib)
+            self.links.append(attrs)
+            if self._celda is not None:
+                self._celda.links.append(attrs)
+
+        if self._fila is None:
+            if tag == "tr":
+                self._fila = _Fila(self._en_tabla())
+            else:
+                self._pila.append((tag, attrib.get("id")))
+            return
+
+        if tag == "tr":
+            self._prof_fila += 1
+        elif tag == "td":
+            if self._celda is None:
+                self._celda = _Celda()
+                self._fila.celdas.append(self._celda)
+            else:
+                self._prof_celda += 1
+
+    def end(self, tag):
+        self._vaciar_texto()
+
+        if self._fila is None:
+            # cierra hasta la última apertura de ese tag (HTML mal balanceado)
+            for i in range(len(self._pila) - 1, -1, -1):
+                if self._pila[i][0] == tag:
+                    del self._pila[i:]
+                    break
+            return
+
+        if tag == "td" and self._celda is not None:
+            if self._prof_celda:
+                self._prof_celda -= 1
+            else:
+                self._celda = None
+        elif tag == "tr":
+            if self._prof_fila:
+                self._prof_fila -= 1
+            else:
+                self.listas.append(self._fila)
+                self._fila = None
+                self._celda = None
+                self._prof_celda = 0
+
+    def data(self, texto):
+        if self._celda is not None:
+            self._texto.append(texto)
+
+    def close(self):
+        self._vaciar_texto()
+        if self._fila is not None:
+            self.listas.append(self._fila)
+            self._fila = None
+
+
+def _trozos(html):
+    if isinstance(html, (str, bytes)):
+        for i in range(0, len(html), TAM_TROZO_HTML):
+            yield html[i:i + TAM_TROZO_HTML]
+    else:
+        # iterable de trozos (p. ej. respuesta HTTP leída en streaming)
+        yield from html
+
+
+def _iterar_eventos(html):
+    """
+    Alimenta el parser por trozos y entrega (filas, links) de lo ya cerrado en cada trozo.
+    `html` puede ser str/bytes o un iterable de trozos.
+    """
+    from lxml import etree
+
+    eventos = _EventosListado()
+    parser = etree.HTMLParser(target=eventos)
+    for trozo in _trozos(html):
+        parser.feed(trozo)
+        if eventos.listas or eventos.links:
+            yield eventos.listas, eventos.links
+            eventos.listas, eventos.links = [], []
+    parser.close()
+    if eventos.listas or eventos.links:
+        yield eventos.listas, eventos.links
+
+
+def _iterar_filas(html):
+    for filas, _ in _iterar_eventos(html):
+        yield from filas
+
+
+def _convertir(fecha_txt, url, convertir_a_date):
+    if not convertir_a_date:
+        return fecha_txt, url
+    try:
+        return parse_fecha_boletin(fecha_txt), url
+    except Exception:
+        # si alguna fecha viene en formato raro, la saltas o la guardas raw
+        return None
+
+
 def obtener_links_boletines(html):
-    soup = BeautifulSoup(html, "lxml")
     links = []
 
-    for a in soup.find_all("a", href=True):
-        title = a.get("title", "").lower()
+    for lote in _iterar_eventos(html):
+        for a in lote[1]:
+            if "href" not in a:
+                continue
+            title = a.get("title", "").lower()
 
-        if "visualizar" in title and "boletín" in title:
-            links.append(a["href"])
+            if "visualizar" in title and "boletín" in title:
+                links.append(a["href"])
 
     return links
 
-def extraer_externos(html: str, convertir_a_date: bool = False):
-    soup = BeautifulSoup(html, "html.parser")
-
-    filas = soup.select("#MyTable tbody tr")
-    print("Filas encontradas en HTML:", len(filas))  # <- debe ser > 10 si viene todo
-
-    resultados = []
-    for tr in filas:
-        tds = tr.find_all("td")
-        if len(tds) < 3:
+def iterar_externos(html, convertir_a_date: bool = False):
+    """
+    Genera (fecha, url_externo) de las filas de #MyTable tbody, una por una.
+    Fecha en la 2da columna (ej: 15-ene.-2026) y el primer link a /externo/ de la 3ra.
+    """
+    for fila in _iterar_filas(html):
+        if not fila.en_tabla or len(fila.celdas) < 3:
             continue
 
-        fecha_txt = tds[1].get_text(" ", strip=True)  # ej: 15-ene.-2026
-        a = tds[2].select_one("a[href*='/externo/']")
-        if not a:
+        a = next((a for a in fila.celdas[2].links if "/externo/" in a.get("href", "")), None)
+        if a is None:
             continue
 
-        url_externo = a["href"]
-        if convertir_a_date:
-            try:
-                fecha_val = parse_fecha_boletin(fecha_txt)
-            except Exception:
-                # si alguna fecha viene en formato raro, la saltas o la guardas raw
-                continue
-            resultados.append((fecha_val, url_externo))
-        else:
-            resultados.append((fecha_txt, url_externo))
+        par = _convertir(fila.celdas[1].texto(), a["href"], convertir_a_date)
+        if par is not None:
+            yield par
 
+def extraer_externos(html, convertir_a_date: bool = False):
+    resultados = list(iterar_externos(html, convertir_a_date))
+    print("Boletines encontrados en HTML:", len(resultados))  # <- debe ser > 10 si viene todo
     return resultados
 
 
-def obtener_fechas_y_links_boletines(html: str, convertir_a_date: bool = False):
-    soup = BeautifulSoup(html, "lxml")
-    resultados = []
-
-    for tr in soup.select("tr"):
-        tds = tr.find_all("td")
-        if len(tds) < 3:
+def iterar_fechas_y_links_boletines(html, convertir_a_date: bool = False):
+    for fila in _iterar_filas(html):
+        if len(fila.celdas) < 3:
             continue
 
-        # Fecha en la 2da columna (índice 1)
-        fecha_txt = tds[1].get_text(" ", strip=True)
-
         # Link "Visualizar el archivo del boletín" dentro de la 3ra columna
-        a = tds[2].find("a", href=True, title=True)
-        if not a:
+        # (el primer <a> con href y title, como find("a", href=True, title=True))
+        a = next((a for a in fila.celdas[2].links if "href" in a and "title" in a), None)
+        if a is None:
             continue
 
-        title = a.get("title", "").lower()
+        title = a["title"].lower()
         if "visualizar" not in title or "boletín" not in title:
             continue
 
-        url = a["href"]
+        par = _convertir(fila.celdas[1].texto(), a["href"], convertir_a_date)
+        if par is not None:
+            yield par
 
-        if convertir_a_date:
-            try:
-                fecha_val = parse_fecha_boletin(fecha_txt)
-            except Exception:
-                # si alguna fecha viene en formato raro, la saltas o la guardas raw
-                continue
-            resultados.append((fecha_val, url))
-        else:
-            resultados.append((fecha_txt, url))
-
-    return resultados
+def obtener_fechas_y_links_boletines(html, convertir_a_date: bool = False):
+    return list(iterar_fechas_y_links_boletines(html, convertir_a_date))
 
 def extraer_paginas_js(html):
     patron = re.compile(
@@ -151,11 +317,12 @@ def obtener_id_numerico(id_raw):
 def obtener_token(url):
     return urlparse(url).path.split("/")[-1]
 
-def normalizar_documento(obj):
+def normalizar_documento(obj, total_paginas):
+    # total_paginas: len(extraer_paginas_js(html)) del visor de ese boletín
     return {
         "token": obtener_token(obj["thumb"]),
         "id_num": obtener_id_numerico(obj["id"]),
-        "total_paginas": 378  # ya lo sabes
+        "total_paginas": total_paginas
     }
 
 def generar_urls_paginas(doc, tam=2):
@@ -178,6 +345,20 @@ def construir_url_temporal(src_url, id_raw, pagina, tam=2):
         f"{token}/{id_num}_{pagina}-{tam}.jpg"
     )
 
+def agregar_urls_directas(paginas, tam=2):
+    """
+    Agrega a cada página de extraer_paginas_js la url directa de su imagen
+    (temporales/{token}/{id}_{pagina}-{tam}.jpg) en p["directa"], para descargarla sin
+    pasar por el thumb. El número de página es su posición en el visor.
+    """
+    if not paginas:
+        return paginas
+
+    doc = normalizar_documento(paginas[0], len(paginas))
+    for p, url in zip(paginas, generar_urls_paginas(doc, tam)):
+        p["directa"] = url
+    return paginas
+
 def obtener_inicio_columnas(texto):
     texto = texto.upper()
 
@@ -192,6 +373,35 @@ def obtener_inicio_columnas(texto):
     pagina_salas = int(match.group(1))
     return max(pagina_salas - 2, 1)
 
+# Índice de la portada: renglones "NOMBRE DE SECCIÓN ....... 123"
+# (nombre en mayúsculas, puntos/guiones de relleno opcionales, página impresa al final)
+PATRON_INDICE = re.compile(r"^\s*([A-Z][A-Z ,]*?[A-Z])[\s.·_-]*?(\d{1,4})\s*$", re.MULTILINE)
+
+def extraer_indice_secciones(texto, total_paginas):
+    """
+    Secciones del índice de la página 1 como [{"nombre", "desde", "hasta"}] en índices
+    de página del visor (mismo corrimiento de 2 que obtener_inicio_columnas).
+    Solo se aceptan números de página crecientes (descarta renglones sueltos del OCR).
+    Cada sección llega hasta la página anterior a la siguiente; la última, al final.
+    """
+    # Renglón por renglón: _normalizar_fechas junta los espacios (incluye saltos de línea)
+    t = "\n".join(_normalizar_fechas(renglon) for renglon in texto.splitlines()).upper()
+
+    entradas = []
+    for nombre, pagina in PATRON_INDICE.findall(t):
+        desde = max(int(pagina) - 2, 1)
+        if desde > total_paginas:
+            continue
+        if entradas and desde < entradas[-1][1]:
+            continue
+        entradas.append((" ".join(nombre.split()), desde))
+
+    secciones = []
+    for i, (nombre, desde) in enumerate(entradas):
+        hasta = entradas[i + 1][1] - 1 if i + 1 < len(entradas) else total_paginas
+        secciones.append({"nombre": nombre, "desde": desde, "hasta": max(hasta, desde)})
+    return secciones
+
 MESES_CONVERT = {
     "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
     "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9,
@@ -200,23 +410,24 @@ MESES_CONVERT = {
 
 def _normalizar_fechas(s: str) -> str:
     # quita acentos y normaliza espacios
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    s = re.sub(r"\s+", " ", s).strip()
-    return s.lower()
+    return normalizar_fechas(s)
+
+# 1) Fecha tipo: viernes 9 de enero de 2026
+# (día de la semana opcional por si OCR lo rompe)
+PATRON_FECHA = re.compile(
+    r"\b(?:lunes|martes|miercoles|jueves|viernes|sabado|domingo)?\s*"
+    r"(\d{1,2})\s*de\s*"
+    r"(enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre)\s*de\s*"
+    r"(\d{4})\b"
+)
+
+# 2) "Num 3" (Num, Núm, Num., Núm., etc.)
+PATRON_NUM = re.compile(r"\bnu[mn]\.?\s*(\d{1,4})\b")  # tolera OCR: num/nun
 
 def extraer_fecha_y_numero_boletin(texto_ocr: str):
     t = _normalizar_fechas(texto_ocr)
 
-    # 1) Extraer fecha tipo: viernes 9 de enero de 2026
-    # (día de la semana opcional por si OCR lo rompe)
-    patron_fecha = re.compile(
-        r"\b(?:lunes|martes|miercoles|jueves|viernes|sabado|domingo)?\s*"
-        r"(\d{1,2})\s*de\s*"
-        r"(enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre)\s*de\s*"
-        r"(\d{4})\b"
-    )
-    m = patron_fecha.search(t)
+    m = PATRON_FECHA.search(t)
     fecha = None
     if m:
         dia = int(m.group(1))
@@ -224,9 +435,7 @@ def extraer_fecha_y_numero_boletin(texto_ocr: str):
         anio = int(m.group(3))
         fecha = date(anio, MESES_CONVERT[mes_txt], dia)
 
-    # 2) Extraer "Num 3" (Num, Núm, Num., Núm., etc.)
-    patron_num = re.compile(r"\bnu[mn]\.?\s*(\d{1,4})\b")  # tolera OCR: num/nun
-    n = patron_num.search(t)
+    n = PATRON_NUM.search(t)
     num = int(n.group(1)) if n else None
 
     return fecha, num
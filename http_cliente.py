@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from configuration import settings
+
+# Cliente HTTP único para todo el scraper.
+# Por dentro es un httpx.AsyncClient corriendo en un event loop propio (hilo de fondo):
+# keep-alive y pools por host compartidos entre todos los hilos del pipeline.
+# Por fuera expone get/post síncronos con la misma forma que requests
+# (r.text, r.content, r.status_code, r.raise_for_status()).
+
+USER_AGENT = "Mozilla/5.0"
+
+# Política de reintentos (la misma que usa crear_sesion)
+REINTENTOS_TOTAL = 5
+REINTENTOS_BACKOFF = 2
+REINTENTOS_BACKOFF_MAX = 120
+REINTENTOS_ESTADOS = (429, 500, 502, 503, 504)
+
+
+class LimitadorTasa:
+    """Token bucket: `tasa` solicitudes por segundo con ráfagas de hasta `rafaga`."""
+
+    def __init__(self, tasa: float, rafaga: int = 1):
+        self.tasa = tasa
+        self.capacidad = max(rafaga, 1)
+        self._tokens = float(self.capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        # El lock mantiene el orden de llegada mientras se espera el siguiente token
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.tasa)
+
+
+class ClienteHttp:
+    def __init__(self, max_conexiones_host: int = 16, timeout: float = 30,
+                 limites_tasa: dict[str, tuple[float, int]] | None = None):
+        self.max_conexiones_host = max_conexiones_host
+        self.timeout = timeout
+        self._semaforos: dict[str, asyncio.Semaphore] = {}
+        # host -> (solicitudes por segundo, ráfaga); hosts sin entrada no se limitan
+        self._limites_tasa = dict(limites_tasa or {})
+        self._limitadores: dict[str, LimitadorTasa] = {}
+
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="http-cliente", daemon=True)
+        self._hilo.start()
+        self._cliente = self._ejecutar(self._crear_cliente())
+
+    async def _crear_cliente(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=None,  # el límite real es por host (semáforos)
+                max_keepalive_connections=self.max_conexiones_host * 4,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(self.timeout),
+            follow_redirects=True,
+        )
+
+    def _ejecutar(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _semaforo(self, host: str) -> asyncio.Semaphore:
+        # Solo se llama dentro del loop, no necesita lock
+        sem = self._semaforos.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_conexiones_host)
+            self._semaforos[host] = sem
+        return sem
+
+    def _limitador(self, host: str) -> LimitadorTasa | None:
+        limitador = self._limitadores.get(host)
+        if limitador is None and host in self._limites_tasa:
+            tasa, rafaga = self._limites_tasa[host]
+            if tasa > 0:
+                limitador = LimitadorTasa(tasa, rafaga)
+                self._limitadores[host] = limitador
+        return limitador
+
+    @staticmethod
+    def _espera_reintento(intento: int, r: httpx.Response | None) -> float:
+        # Misma política que crear_sesion (urllib3 Retry): respeta Retry-After y si no
+        # backoff exponencial; el primer reintento es inmediato.
+        if r is not None:
+            retry_after = r.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), REINTENTOS_BACKOFF_MAX)
+        if intento <= 1:
+            return 0
+        return min(REINTENTOS_BACKOFF * (2 ** (intento - 1)), REINTENTOS_BACKOFF_MAX)
+
+    async def solicitar(self, metodo: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        limitador = self._limitador(host)
+        reintentable = metodo.upper() == "GET"
+        intento = 0
+
+        while True:
+            r = None
+            if limitador is not None:
+                await limitador.adquirir()
+            try:
+                async with self._semaforo(host):
+                    r = await self._cliente.request(metodo, url, **kwargs)
+            except httpx.TransportError:
+                if not reintentable or intento >= REINTENTOS_TOTAL:
+                    raise
+            else:
+                if not reintentable or r.status_code not in REINTENTOS_ESTADOS or intento >= REINTENTOS_TOTAL:
+                    return r
+
+            intento += 1
+            await asyncio.sleep(self._espera_reintento(intento, r))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self._ejecutar(self.solicitar("GET", url, **kwargs))
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self._ejecutar(self.solicitar("POST", url, **kwargs))
+
+    def cerrar(self):
+        self._ejecutar(self._cliente.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(timeout=5)
+
+
+def limites_tasa_configurados() -> dict[str, tuple[float, int]]:
+    # Límites separados para el portal (consultabpj) y el host de imágenes (edigital)
+    limites = {}
+    host_portal = urlparse(settings.url_boletin).netloc
+    if host_portal:
+        limites[host_portal] = (settings.tasa_portal, settings.tasa_rafaga)
+    if settings.host_imagenes:
+        limites[settings.host_imagenes] = (settings.tasa_imagenes, settings.tasa_rafaga)
+    return limites
+
+
+_cliente: ClienteHttp | None = None
+_cliente_pid: int | None = None
+_lock = threading.Lock()
+
+
+def obtener_cliente() -> ClienteHttp:
+    # Uno por proceso (un fork no hereda el hilo del event loop)
+    global _cliente, _cliente_pid
+    with _lock:
+        if _cliente is None or _cliente_pid != os.getpid():
+            _cliente = ClienteHttp(
+                max_conexiones_host=settings.http_max_conexiones_host,
+                timeout=settings.http_timeout,
+                limites_tasa=limites_tasa_configurados(),
+            )
+            _cliente_pid = os.getpid()
+        return _cliente
@@ -1,48 +1,154 @@
 import cv2
-import pytesseract
-pytesseract.pytesseract.tesseract_cmd = r'/opt/homebrew/bin/tesseract'
+import math
 import numpy as np
 import os
-def descargar_imagen(session, url, ruta_salida):
-    r = session.get(url, timeout=30)
-    r.raise_for_status()
-    with open(ruta_salida, "wb") as f:
-        f.write(r.content)
-
-def procesar_pagina(session, url_img, idx):
-    path = f"tmp/pagina_{idx}.jpg"
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from configuration import settings
+from layout import regiones_columnas, altura_caracteres
+from ocr import reconocer
+from cache_ocr import ocr_con_cache
+from telemetria import etapa
+
+# Carpeta de los volcados de debug (solo se escribe si se pide explícitamente)
+DEBUG_DIR = "tmp"
+
+# Escalado previo al OCR de las páginas completas (OCR_RESOLUCION=fija, o cuando no se
+# puede medir la letra)
+ESCALA_PAGINA = 1.7
+
+def politica_resolucion() -> str:
+    # Identifica la política de escalado (entra en la clave de la caché OCR)
+    if settings.ocr_resolucion != "adaptativa":
+        return f"x{ESCALA_PAGINA}"
+    return (
+        f"adaptativa:h{settings.ocr_altura_objetivo}"
+        f":{settings.ocr_escala_min}-{settings.ocr_escala_max}:def{ESCALA_PAGINA}"
+    )
 
-    descargar_imagen(session, url_img, path)
-    img = preprocesar_imagen(path, True)
-    texto = ocr_imagen(img)
+# Variantes de preprocesado (forman parte de la clave de la caché OCR)
+VARIANTE_PAGINA = f"preprocesar_imagen:{politica_resolucion()}"
+VARIANTE_COLUMNA = (
+    f"preprocesar_imagen_columna:x1.0:ocr_por_columnas:layout{settings.columnas_ocr}"
+)
 
-    try:
-        os.remove(path)
-    except FileNotFoundError:
-        pass
+def descargar_imagen(session, url, ruta_salida=None):
+    with etapa("descarga", paginas=1) as m:
+        r = session.get(url, timeout=30)
+        m.bytes = len(r.content)
+    r.raise_for_status()
+    # Solo se escribe a disco si se pide una ruta; normalmente se trabaja en memoria
+    if ruta_salida:
+        with open(ruta_salida, "wb") as f:
+            f.write(r.content)
+    return r.content
+
+def decodificar_imagen(contenido, flags=cv2.IMREAD_GRAYSCALE):
+    img = cv2.imdecode(np.frombuffer(contenido, dtype=np.uint8), flags)
+    if img is None:
+        raise ValueError("No se pudo decodificar la imagen descargada")
+    return img
 
+def cargar_imagen(origen, flags=cv2.IMREAD_GRAYSCALE):
+    # Acepta bytes (respuesta HTTP), un ndarray ya decodificado o una ruta en disco
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return decodificar_imagen(origen, flags)
+    if isinstance(origen, np.ndarray):
+        return origen
+    return cv2.imread(origen, flags)
+
+def _nombre_debug(origen, nombre_debug):
+    if nombre_debug:
+        return nombre_debug
+    if isinstance(origen, str):
+        return os.path.basename(origen)
+    return "pagina.jpg"
+
+def volcar_debug(nombre, img):
+    os.makedirs(DEBUG_DIR, exist_ok=True)
+    cv2.imwrite(os.path.join(DEBUG_DIR, nombre), img)
+
+def procesar_pagina(session, url_img, idx, debug=False):
+    contenido = descargar_imagen(session, url_img)
+    return ocr_pagina(contenido, idx, debug)
+
+def ocr_pagina(contenido, idx=0, debug=False):
+    def calcular():
+        with etapa("preprocesado", paginas=1):
+            img = preprocesar_imagen(contenido, debug, f"pagina_{idx}.jpg")
+        escala = getattr(_escala_local, "ultima", None)
+        with etapa("ocr", paginas=1):
+            return ocr_imagen(img), escala
+
+    # Con volcado de debug se ignora la caché para que siempre se generen las imágenes
+    if debug or not isinstance(contenido, (bytes, bytearray)):
+        texto, escala = calcular()
+    else:
+        # La escala viaja con el texto en la caché: un acierto también la deja para tomar_escala
+        texto, escala = ocr_con_cache(contenido, VARIANTE_PAGINA, calcular, con_escala=True)
+    _escala_local.ultima = escala
     return texto
 
 def ocr_imagen(img):
-    return pytesseract.image_to_string(
-        img,
-        lang="spa+eng",
-        config="--psm 4 --oem 3"
-    )
+    return reconocer(img)
 
-def preprocesar_base(path):
-    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+def preprocesar_base(origen):
+    img = cargar_imagen(origen, cv2.IMREAD_GRAYSCALE)
     img = cv2.medianBlur(img, 3)
     img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
     return img
 
-def mejorar_resolucion(img):
+def escala_ocr(img):
+    """
+    Escala para el OCR según OCR_RESOLUCION:
+    - fija: ESCALA_PAGINA
+    - adaptativa: la menor escala (en pasos de 0.1) con la que la altura típica de las
+      letras (layout.altura_caracteres) llega a OCR_ALTURA_OBJETIVO pixeles, acotada a
+      [OCR_ESCALA_MIN, OCR_ESCALA_MAX]; si no se puede medir, ESCALA_PAGINA.
+    Regresa (escala, altura medida o None).
+    """
+    if settings.ocr_resolucion != "adaptativa":
+        return ESCALA_PAGINA, None
+
+    altura = altura_caracteres(img)
+    if altura is None:
+        return ESCALA_PAGINA, None
+
+    escala = math.ceil(settings.ocr_altura_objetivo / altura * 10 - 1e-9) / 10
+    escala = min(max(escala, settings.ocr_escala_min), settings.ocr_escala_max)
+    return escala, altura
+
+# Escala de la última página preprocesada en este hilo (ver tomar_escala)
+_escala_local = threading.local()
+
+def _registrar_escala(escala, altura, nombre):
+    # El detalle por página lo recoge quien hizo el OCR con tomar_escala (textos_ocr y el
+    # histograma escalas_ocr de la fila de telemetría del boletín)
+    _escala_local.ultima = (escala, altura)
+    if settings.is_debbug:
+        print(f"Escala OCR {nombre}: x{escala} (altura de letra {altura})")
+
+def tomar_escala():
+    """
+    (escala, altura medida o None) de la última página completa reconocida en este hilo
+    (preprocesada o desde la caché OCR), y la olvida. None en las páginas en columnas:
+    esas no se escalan.
+    """
+    ultima = getattr(_escala_local, "ultima", None)
+    _escala_local.ultima = None
+    return ultima
+
+def mejorar_resolucion(img, escala=None):
+    if escala is None:
+        escala, _ = escala_ocr(img)
+    if escala == 1:
+        return img
     return cv2.resize(
         img,
         None,
-        fx=1.5,
-        fy=1.5,
-        interpolation=cv2.INTER_CUBIC
+        fx=escala,
+        fy=escala,
+        interpolation=cv2.INTER_CUBIC if escala > 1 else cv2.INTER_AREA
     )
 
 def unir_letras(img):
@@ -52,16 +158,12 @@ def unir_letras(img):
 def limpiar_ruido(img):
     return cv2.medianBlur(img, 3)
 
-def preprocesar_imagen(path, debug=False):
-    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+def preprocesar_imagen(origen, debug=False, nombre_debug=None):
+    img = cargar_imagen(origen, cv2.IMREAD_GRAYSCALE)
 
-    img = cv2.resize(
-        img,
-        None,
-        fx=1.7,
-        fy=1.7,
-        interpolation=cv2.INTER_CUBIC
-    )
+    escala, altura = escala_ocr(img)
+    _registrar_escala(escala, altura, _nombre_debug(origen, nombre_debug))
+    img = mejorar_resolucion(img, escala)
 
     img = cv2.medianBlur(img, 3)
 
@@ -71,44 +173,67 @@ def preprocesar_imagen(path, debug=False):
     )[1]
 
     if debug:
-        cv2.imwrite(
-            f"tmp/debug_{os.path.basename(path)}",
-            img
-        )
+        volcar_debug(f"debug_{_nombre_debug(origen, nombre_debug)}", img)
 
     return img
 
-def ocr_por_columnas(img):
-    h, w = img.shape[:2]
-    mitad = w // 2
-
-    col_izq = img[:, :mitad]
-    col_der = img[:, mitad:]
+# Hilos para el OCR de las columnas de una página (uno por proceso; cada hilo tiene su motor)
+_pool_columnas = None
+_pool_pid = None
+_pool_lock = threading.Lock()
 
-    texto_izq = ocr_imagen(col_izq)
-    texto_der = ocr_imagen(col_der)
+def _pool_ocr_columnas():
+    global _pool_columnas, _pool_pid
+    with _pool_lock:
+        if _pool_columnas is None or _pool_pid != os.getpid():
+            _pool_columnas = ThreadPoolExecutor(max_workers=settings.hilos_ocr_columnas, thread_name_prefix="ocr-columna")
+            _pool_pid = os.getpid()
+        return _pool_columnas
 
-    return texto_izq + "\n" + texto_der
-
-def procesar_pagina_columna(session, url_img, idx):
-    path = f"tmp/pagina_{idx}.jpg"
-    #path = f"tmp/boletin_prueba.jpg"
-    descargar_imagen(session, url_img, path)
-    img = preprocesar_imagen_columna(path, True)
-    #img = cv2.imread()
-    texto = ocr_por_columnas(img)
-
-    try:
-        os.remove(path)
-    except FileNotFoundError:
-        pass
-
-    return texto
+def ocr_por_columnas(img):
+    """
+    OCR por columnas con análisis de layout (layout.py): se recorta cada columna a su
+    contenido (sin márgenes ni el blanco del canal) y los recortes van a tesseract en
+    paralelo. Los textos se unen de izquierda a derecha.
+    """
+    regiones = regiones_columnas(img, settings.columnas_ocr)
+    if not regiones:
+        return ""
+
+    recortes = [img[y0:y1, x0:x1] for y0, y1, x0, x1 in regiones]
+    if len(recortes) == 1 or settings.hilos_ocr_columnas <= 1:
+        textos = [ocr_imagen(r) for r in recortes]
+    else:
+        textos = list(_pool_ocr_columnas().map(ocr_imagen, recortes))
+
+    return "\n".join(textos)
+
+def procesar_pagina_columna(session, url_img, idx, debug=False):
+    contenido = descargar_imagen(session, url_img)
+    return ocr_pagina_columna(contenido, idx, debug)
+
+def ocr_pagina_columna(contenido, idx=0, debug=False):
+    def calcular():
+        with etapa("preprocesado", paginas=1):
+            img = preprocesar_imagen_columna(contenido, debug, f"pagina_{idx}.jpg")
+        with etapa("ocr", paginas=1):
+            return ocr_por_columnas(img)
+
+    if debug or not isinstance(contenido, (bytes, bytearray)):
+        return calcular()
+    return ocr_con_cache(contenido, VARIANTE_COLUMNA, calcular)
+
+def preprocesar_imagen_columna(origen, debug=False, nombre_debug=None):
+    # Cargar imagen
+    img = cargar_imagen(origen, cv2.IMREAD_COLOR)
+    if debug:
+        nombre = _nombre_debug(origen, nombre_debug)
+        volcar_debug(f"sin_solo_consulta_{nombre}", _quitar_solo_consulta(img))
+        volcar_debug(f"debug_{nombre}", img)
+    return img
 
-def     preprocesar_imagen_columna(path, debug=True):
-   
-# Cargar imagen
-    img = cv2.imread(path)
+def _quitar_solo_consulta(img):
+    # Prueba para quitar la marca "SOLO CONSULTA"; de momento solo se usa en los volcados de debug
     ## prueba tratando de quitar solo consults. img =  eliminar_solo_consulta(img)
     #Escala de grises
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -123,15 +248,7 @@ def     preprocesar_imagen_columna(path, debug=True):
     mask = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
 
     # Inpainting (rellenar con fondo)
-    resultado = cv2.inpaint(img, mask, 7, cv2.INPAINT_TELEA)
-
-    # Guardar resultado
-    cv2.imwrite("boletin_sin_solo_consulta.jpg", resultado)
-
-    if debug:
-        os.makedirs("tmp", exist_ok=True)
-        cv2.imwrite(f"tmp/debug_{os.path.basename(path)}", img)
-    return img
+    return cv2.inpaint(img, mask, 7, cv2.INPAINT_TELEA)
 
 def eliminar_solo_consulta(img):
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+
+# Análisis de layout de las páginas en columnas, con perfiles de proyección:
+# - perfil horizontal (tinta por renglón) -> caja de contenido, sin márgenes blancos
+# - perfil vertical (tinta por columna de pixeles) -> canales entre columnas de texto
+# Todo son reducciones de NumPy sobre la imagen binarizada (tinta = 1).
+
+# Fracción de la tinta máxima por debajo de la cual un renglón/columna de pixeles
+# se considera vacío (absorbe polvo y ruido del JPEG)
+UMBRAL_VACIO = 0.02
+
+# Para los canales entre columnas se tolera más tinta: el encabezado y los pies de página
+# cruzan el canal a todo lo ancho pero solo ocupan unos cuantos renglones
+UMBRAL_CANAL = 0.05
+
+# Pixeles de blanco que se dejan alrededor de cada recorte (tesseract los necesita)
+MARGEN = 12
+
+
+def binarizar(img):
+    gris = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    _, binaria = cv2.threshold(gris, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return binaria
+
+
+def _suavizar(perfil, ancho):
+    if ancho <= 1:
+        return perfil.astype(np.float32)
+    nucleo = np.ones(ancho, dtype=np.float32) / ancho
+    return np.convolve(perfil.astype(np.float32), nucleo, mode="same")
+
+
+def _rango_con_tinta(perfil, umbral):
+    llenos = np.flatnonzero(perfil > umbral)
+    if llenos.size == 0:
+        return None
+    return int(llenos[0]), int(llenos[-1]) + 1
+
+
+def caja_contenido(binaria):
+    """(y0, y1, x0, x1) de la zona con tinta, o None si la página está en blanco."""
+    por_renglon = binaria.sum(axis=1)
+    por_columna = binaria.sum(axis=0)
+    filas = _rango_con_tinta(por_renglon, por_renglon.max() * UMBRAL_VACIO)
+    columnas = _rango_con_tinta(por_columna, por_columna.max() * UMBRAL_VACIO)
+    if filas is None or columnas is None:
+        return None
+    return filas[0], filas[1], columnas[0], columnas[1]
+
+
+def _canales(perfil, ancho_min):
+    # Corridas de columnas de pixeles vacías (sin tocar los bordes): (inicio, fin)
+    vacio = perfil <= perfil.max() * UMBRAL_CANAL
+    cambios = np.flatnonzero(np.diff(vacio.astype(np.int8)))
+    canales = []
+    inicio = None
+    for pos in cambios:
+        if vacio[pos + 1]:
+            inicio = pos + 1
+        elif inicio is not None:
+            if pos + 1 - inicio >= ancho_min:
+                canales.append((inicio, pos + 1))
+            inicio = None
+    return canales
+
+
+def cortes_columnas(binaria, n_columnas=2):
+    """
+    Posiciones x (relativas a `binaria`) donde separar las columnas.
+    - n_columnas > 1: para cada corte esperado (k * ancho / n) se busca, en una ventana
+      de ±30% del ancho de columna, el canal vacío más ancho; si no hay ninguno, el
+      mínimo del perfil suavizado (el encabezado a todo lo ancho no deja canal limpio).
+    - n_columnas == 0: automático, un corte en el centro de cada canal ancho.
+    """
+    alto, ancho = binaria.shape[:2]
+    perfil = _suavizar(binaria.sum(axis=0), max(ancho // 200, 1))
+    ancho_min = max(ancho // 80, 3)
+    canales = _canales(perfil, ancho_min)
+
+    if n_columnas == 0:
+        return [int(a + b) // 2 for a, b in canales]
+
+    cortes = []
+    paso = ancho / n_columnas
+    for k in range(1, n_columnas):
+        esperado = k * paso
+        lo, hi = int(esperado - 0.3 * paso), int(esperado + 0.3 * paso)
+        cercanos = [(b - a, (a + b) // 2) for a, b in canales if lo <= (a + b) // 2 <= hi]
+        if cercanos:
+            cortes.append(int(max(cercanos)[1]))
+        else:
+            cortes.append(lo + int(np.argmin(perfil[lo:hi])))
+    return cortes
+
+
+def regiones_columnas(img, n_columnas=2):
+    """
+    Recortes (y0, y1, x0, x1) de cada columna de texto, de izquierda a derecha,
+    ya ajustados a su propio contenido. Página en blanco -> [] .
+    """
+    binaria = binarizar(img)
+    caja = caja_contenido(binaria)
+    if caja is None:
+        return []
+
+    y0, y1, x0, x1 = caja
+    contenido = binaria[y0:y1, x0:x1]
+    limites = [0, *cortes_columnas(contenido, n_columnas), x1 - x0]
+
+    alto, ancho = binaria.shape[:2]
+    regiones = []
+    for a, b in zip(limites, limites[1:]):
+        if b - a < 2:
+            continue
+        # Ajuste vertical por columna: una columna más corta no arrastra blanco de más
+        filas = _rango_con_tinta(contenido[:, a:b].sum(axis=1), 0)
+        if filas is None:
+            continue
+        # Margen blanco solo hacia afuera: en los cortes internos ya está el canal
+        izq = MARGEN if a == 0 else 0
+        der = MARGEN if b == x1 - x0 else 0
+        regiones.append((
+            max(y0 + filas[0] - MARGEN, 0),
+            min(y0 + filas[1] + MARGEN, alto),
+            max(x0 + a - izq, 0),
+            min(x0 + b + der, ancho),
+        ))
+    return regiones
+
+
+def altura_caracteres(img) -> float | None:
+    """
+    Altura típica de los caracteres en pixeles: mediana de la altura de los componentes
+    conexos con forma de letra (descarta puntos, rayas, manchas y la marca de agua).
+    None si no hay suficientes componentes (página en blanco o solo imágenes).
+    """
+    binaria = binarizar(img)
+    n, _, stats, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+    if n <= 1:
+        return None
+
+    alto = stats[1:, cv2.CC_STAT_HEIGHT]
+    ancho = stats[1:, cv2.CC_STAT_WIDTH]
+    area = stats[1:, cv2.CC_STAT_AREA]
+    letras = (alto >= 4) & (alto <= 200) & (ancho <= alto * 3) & (area >= 8)
+    if np.count_nonzero(letras) < 20:
+        return None
+    return float(np.median(alto[letras]))
@@ -1,83 +1,395 @@
 # main.py
-import requests
+"""
+Scraper del boletín judicial por etapas. Cada etapa lee y escribe archivos, así que se
+puede correr (y repetir) por separado:
+
+    python main.py discover --salida boletines.jsonl          # listado de boletines (sin base)
+    python main.py fetch --entrada boletines.jsonl --salida descargados.jsonl
+    python main.py ocr   --entrada descargados.jsonl --textos textos
+    python main.py parse --textos textos --salida expedientes.jsonl
+    python main.py load  --entrada expedientes.jsonl          # inserta en la base
+    python main.py reparse --desde 2026-01-01 [--reemplazar]  # parser actual vs. la base
+    python main.py run                                        # todo junto (lo de siempre)
+    python main.py depurar --salida repetidos.jsonl [--aplicar]  # expedientes repetidos (migración)
+
+Sin subcomando corre `run`. Las dependencias pesadas (cv2, tesseract, sqlalchemy...) se
+importan solo en las etapas que las usan, y el engine de la base se crea al primer uso.
+"""
+import argparse
+import json
 import os
-from scraper import *
-from redirection import *
-from extractor_js import *
-from scraper import *
-from images import *
+import sys
+from datetime import date
+
 from configuration import settings
-from repository import *
-from text_extractor import *
-os.makedirs("tmp", exist_ok=True)
-
-session = crear_sesion()
-session.headers.update({
-    "User-Agent": "Mozilla/5.0"
-})
-
-URL_Boletin = settings.url_boletin
-textos = []
-debug = settings.is_debbug
-html = obtener_html(URL_Boletin)
-html2 = obtener_html_filtrado(settings.url_boletin_filtro,URL_Boletin, settings.fecha_ini, settings.fecha_fin)
-
-externos = extraer_externos(html2,settings.is_debbug)
-print("HTML obtenido correctamente")
-
-#links = obtener_fechas_y_links_boletines(html, settings.is_debbug)
-
-for fecha,l in externos:
-    if not existe_procesamiento(fecha, l):
-        expedientes=[]
-        direccion = extraer_url_redireccion(html = obtener_html(l))
-        html = requests.get(direccion).text
-        resultado = extraer_paginas_js(html)
-        contador = 1
-        fecha_pub: date | None = None 
-        num_boletin: int
-        for p in resultado:
-            html_thumb = session.get(p["thumb"]).text 
-            print(f"OCR página {html_thumb}")
-            if contador == 1 or contador < inicio_columnas:
-                texto = procesar_pagina(session, html_thumb, contador)
-            else:
-                texto = procesar_pagina_columna(session, html_thumb, contador)
-                expedientes.extend(parse_arrendamiento_block(texto, fecha_pub, num_boletin, contador+2))
-            if contador == 1:
-                inicio_columnas = obtener_inicio_columnas(texto)
-                fecha_pub , num_boletin = extraer_fecha_y_numero_boletin(texto)
-
-            textos.append(texto)
-            if debug:
-                if contador == 15:
-                    break
-            contador+=1
-        cantidad_insercion = insertar_expedientes_bulk(expedientes)
-
-        cont = 1
-        fecha_string = fecha.isoformat()
-
-        if debug:
-            for cont, texto in enumerate(textos, start=1):
-                ruta_salida = f"revision_boletin{fecha_string}.txt"
-                guardar_texto_incremental(
-                    ruta_salida,
-                    texto,   
-                    cont     
-                )
-                cont +=1
-
-        if cantidad_insercion > 0:
-            insertar_procesamiento_boletin(
-            fecha_boletin=fecha,
-            url_boletin=l,
-            estado="TERMINADO",
-            descargado=False,
-            nombre_archivo="",#f"boletin_{fecha_string}.pdf",
-            total_paginas=contador,
-            total_expedientes=len(expedientes),
-            )
+
+
+# -----------------------------
+# Archivos entre etapas (JSONL)
+# -----------------------------
+def _a_json(valor):
+    return valor.isoformat() if isinstance(valor, date) else valor
+
+
+def _fecha(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+def _reportar_fallidas(fallidas) -> int:
+    # Código de salida: 1 si el listado quedó incompleto (ventanas de descubrimiento fallidas)
+    if not fallidas:
+        return 0
+    rangos = ", ".join(f"{ini}..{fin}" for ini, fin in fallidas)
+    print(f"ERROR: listado incompleto, fallaron {len(fallidas)} ventanas de fechas: {rangos}")
+    return 1
+
+
+def escribir_jsonl(ruta, filas) -> int:
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    total = 0
+    with open(ruta, "w", encoding="utf-8") as f:
+        for fila in filas:
+            f.write(json.dumps({k: _a_json(v) for k, v in fila.items()}, ensure_ascii=False) + "\n")
+            total += 1
+    return total
+
+
+def leer_jsonl(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def leer_boletines(ruta) -> list[tuple[date, str]]:
+    return [(_fecha(b["fecha"]), b["url"]) for b in leer_jsonl(ruta)]
+
+
+# -----------------------------
+# Etapas
+# -----------------------------
+def cmd_discover(args):
+    from descubrimiento import descubrir_externos, descubrir_configurado
+
+    if args.desde or args.hasta:
+        externos, fallidas = descubrir_externos(
+            settings.url_boletin_filtro, settings.url_boletin,
+            args.desde or settings.fecha_ini, args.hasta or settings.fecha_fin,
+            ventana=settings.descubrimiento_ventana or "mes",
+            concurrencia=settings.descubrimiento_concurrencia,
+            reintentos=settings.descubrimiento_reintentos,
+        )
     else:
-        print(f"Ya existe {l}")
-   
+        externos, fallidas = descubrir_configurado(settings.url_boletin_filtro, settings.url_boletin)
+
+    if args.pendientes:
+        # Solo aquí se necesita la base
+        from repository import filtrar_no_procesados
+
+        externos = filtrar_no_procesados(externos)
+
+    total = escribir_jsonl(args.salida, ({"fecha": f, "url": u} for f, u in externos))
+    print(f"{total} boletines en {args.salida}")
+    return _reportar_fallidas(fallidas)
+
+
+def cmd_fetch(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from archivo_paginas import ArchivoBoletin
+    from extractor_js import extraer_paginas_js, agregar_urls_directas
+    from http_cliente import obtener_cliente
+    from pipeline import _mapa_ordenado, _descargar_pagina, _con_telemetria, paginas_a_procesar
+    from redirection import obtener_url_redireccion
+    from telemetria import etapa
+
+    session = obtener_cliente()
+    descargados = []
+    with ThreadPoolExecutor(max_workers=max(settings.hilos_descarga, 1)) as pool:
+        for fecha, url in leer_boletines(args.entrada):
+            with etapa("visor") as m:
+                html = session.get(obtener_url_redireccion(url), timeout=30).text
+                m.bytes = len(html)
+            paginas = extraer_paginas_js(html)
+            if settings.url_directa:
+                agregar_urls_directas(paginas, settings.tam_imagen)
+            paginas = paginas_a_procesar(paginas, settings.is_debbug)
+
+            archivo = ArchivoBoletin(fecha, args.archivo)
+            try:
+                # Solo lo que falta en el archivo; repetir la etapa no vuelve a descargar
+                tareas = (
+                    (session, archivo, idx, p["thumb"], p.get("directa"), False, False)
+                    for idx, p in enumerate(paginas, start=1)
+                    if idx not in archivo
+                )
+                nuevas = sum(1 for _ in _con_telemetria(
+                    _mapa_ordenado(pool, _descargar_pagina, tareas, settings.tam_cola)))
+            finally:
+                archivo.cerrar()
+
+            print(f"Boletín {fecha}: {len(paginas)} páginas ({nuevas} descargadas) en {archivo.ruta}")
+            descargados.append({"fecha": fecha, "url": url, "total_paginas": len(paginas)})
+
+    escribir_jsonl(args.salida, descargados)
+
+
+def cmd_ocr(args):
+    from archivo_paginas import ArchivoBoletin
+    from images import ocr_pagina, tomar_escala
+    from pipeline import (
+        contexto_portada, planear_paginas, iterar_textos_archivo, crear_ejecutores, cerrar_ejecutores,
+        datos_pagina,
+    )
+    from textos_ocr import EscritorTextos, ruta_textos, leer_textos, pendientes_ocr
+
+    debug = settings.is_debbug
+    ejecutores = crear_ejecutores(0, settings.procesos_ocr if settings.pipeline_activo else 0)
+    try:
+        for b in leer_jsonl(args.entrada):
+            fecha, total = _fecha(b["fecha"]), b["total_paginas"]
+            archivo = ArchivoBoletin(fecha, args.archivo)
+            try:
+                portada = archivo.leer(1)
+                if portada is None:
+                    print(f"Boletín {fecha}: falta la página 1 en {archivo.ruta}; se omite")
+                    continue
+                ruta = ruta_textos(args.textos, fecha)
+
+                # Sin --rehacer se completa lo ya guardado: no se repiten las páginas con OCR
+                # completo y las que el prefiltro descartó van directo al OCR completo
+                previas = {}
+                if not args.rehacer and os.path.exists(ruta):
+                    previas = {p["pagina"]: p for p in leer_textos(ruta)[1]}
+                sin_prefiltro = set(pendientes_ocr(list(previas.values())))
+                hechas = set(previas) - sin_prefiltro
+
+                datos_portada = None
+                if 1 in hechas:
+                    texto = previas[1]["texto"]
+                else:
+                    texto = ocr_pagina(portada, 1, settings.volcar_imagenes)
+                    datos_portada = datos_pagina(tomar_escala())
+                contexto = contexto_portada(texto)
+                plan, _ = planear_paginas(texto, total, contexto[2], incluir_previas=debug,
+                                          incluidas=settings.secciones_incluidas,
+                                          excluidas=settings.secciones_excluidas)
+
+                encabezado = {
+                    "fecha": fecha, "url": b["url"], "total_paginas": total,
+                    "fecha_pub": contexto[0], "num_boletin": contexto[1], "inicio_columnas": contexto[2],
+                }
+                with EscritorTextos(ruta, encabezado, anexar=bool(previas)) as textos:
+                    escritas = 0
+                    if datos_portada is not None:
+                        textos.agregar(1, texto, False, datos_portada)
+                        escritas = 1
+                    for idx, t, columnas, datos in iterar_textos_archivo(
+                        archivo, [i for i in plan if i not in hechas], contexto[2], ejecutores[1],
+                        settings.tam_cola, settings.volcar_imagenes, sin_prefiltro=sin_prefiltro,
+                    ):
+                        textos.agregar(idx, t, columnas, datos)
+                        escritas += 1
+                print(f"Boletín {fecha}: {escritas} páginas reconocidas en {ruta} "
+                      f"({len(hechas)} ya estaban, {len(sin_prefiltro)} descartadas antes por el prefiltro)")
+            finally:
+                archivo.cerrar()
+    finally:
+        cerrar_ejecutores(ejecutores)
+
+
+def cmd_parse(args):
+    from reparse import reparsear
+    from textos_ocr import listar_textos
+
+    boletines = reparsear(listar_textos(args.textos, args.desde, args.hasta), args.procesos)
+    total = escribir_jsonl(args.salida, (reg for _, registros, _ in boletines for reg in registros))
+    print(f"{total} expedientes de {len(boletines)} boletines en {args.salida}")
+
+
+def cmd_reparse(args):
+    from dedup import IndiceDedup
+    from reparse import reparsear, diferencias
+    from repository import expedientes_de_boletin, reemplazar_expedientes_boletin
+    from textos_ocr import listar_textos, contexto
+
+    cambios = []
+    for encabezado, registros, paginas in reparsear(listar_textos(args.textos, args.desde, args.hasta), args.procesos):
+        fecha_pub, num_boletin, inicio_columnas = contexto(encabezado)
+        if fecha_pub is None or num_boletin is None:
+            print(f"Boletín {encabezado.get('fecha')}: sin fecha/número de publicación en el OCR; se omite")
+            continue
+
+        if settings.dedup_activo:
+            # Igual que al cargar: la llave de dedup incluye el boletín, basta un índice por boletín
+            registros, _ = IndiceDedup().filtrar(registros)
+
+        etiqueta = f"Boletín {fecha_pub} núm. {num_boletin}"
+        esperadas = (encabezado.get("total_paginas") or 0) - max(inicio_columnas, 2) + 1
+        faltantes = esperadas - len(paginas)
+        if faltantes > 0:
+            # Solo se compara/reemplaza lo que está en el almacén; el resto de la base no se toca
+            print(f"{etiqueta}: el almacén no cubre {faltantes} páginas; solo se usan las {len(paginas)} guardadas")
+        if args.reemplazar:
+            borrados, insertados = reemplazar_expedientes_boletin(fecha_pub, num_boletin, registros, paginas)
+            print(f"{etiqueta}: {borrados} expedientes borrados, {insertados} insertados")
+            continue
+
+        agregados, quitados = diferencias(registros, expedientes_de_boletin(fecha_pub, num_boletin, paginas))
+        print(f"{etiqueta}: {len(registros)} expedientes, +{len(agregados)} -{len(quitados)}")
+        cambios.extend({"cambio": "+", **r} for r in agregados)
+        cambios.extend({"cambio": "-", **r} for r in quitados)
+
+    if args.salida and not args.reemplazar:
+        escribir_jsonl(args.salida, cambios)
+        print(f"{len(cambios)} diferencias en {args.salida}")
+
+
+def cmd_load(args):
+    from dedup import IndiceDedup
+    from repository import asegurar_esquema, cargar_expedientes, llaves_expedientes
+
+    asegurar_esquema()
+    registros = []
+    for reg in leer_jsonl(args.entrada):
+        reg["fecha_publicacion"] = _fecha(reg.get("fecha_publicacion"))
+        registros.append(reg)
+
+    suprimidos = 0
+    fechas = [r["fecha_publicacion"] for r in registros if r["fecha_publicacion"]]
+    if settings.dedup_activo and fechas:
+        dedup = IndiceDedup()
+        dedup.precargar(llaves_expedientes(min(fechas), max(fechas)))
+        nuevos, _ = dedup.filtrar(registros)
+        suprimidos = len(registros) - len(nuevos)
+        registros = nuevos
+
+    insertadas = omitidas = 0
+    for i in range(0, len(registros), args.lote):
+        nuevas, repetidas = cargar_expedientes(registros[i:i + args.lote])
+        insertadas += nuevas
+        omitidas += repetidas
+    print(f"{insertadas} expedientes insertados ({omitidas} ya existían, {suprimidos} repetidos descartados)")
+
+
+def cmd_depurar(args):
+    import db
+    from repository import expedientes_repetidos, depurar_expedientes
+
+    if db.engine.dialect.name != "postgresql":
+        print("depurar solo aplica en postgres (índice único de expedientes)")
+        return
+    # Primero el respaldo de lo que se borraría; sin --aplicar la base no se toca
+    repetidos = expedientes_repetidos()
+    total = escribir_jsonl(args.salida, repetidos)
+    print(f"{total} expedientes repetidos (se conserva el id menor de cada llave) en {args.salida}")
+    if not args.aplicar:
+        print("Sin --aplicar no se borró nada")
+        return
+    borrados = depurar_expedientes([r["id"] for r in repetidos])
+    print(f"{borrados} expedientes borrados; índice único de expedientes creado")
+
+
+def cmd_run(args):
+    from http_cliente import obtener_cliente
+    from repository import asegurar_esquema
+    from descubrimiento import descubrir_configurado
+    from planificador import ejecutar_boletines
+
+    # Cliente HTTP compartido por el listado, la redirección, los thumbs y las imágenes
+    session = obtener_cliente()
+    asegurar_esquema()
+
+    # Por ventanas de fechas en paralelo (DESCUBRIMIENTO_VENTANA) o un solo POST
+    externos, fallidas = descubrir_configurado(settings.url_boletin_filtro, settings.url_boletin)
+    print("HTML obtenido correctamente")
+
+    # Lo encontrado se procesa igual; la corrida no se da por buena si faltaron ventanas
+    ejecutar_boletines(session, externos)
+
+    if settings.ocr_cache_activo:
+        from cache_ocr import estadisticas as estadisticas_cache_ocr
+
+        print("Caché OCR:", estadisticas_cache_ocr())
+    return _reportar_fallidas(fallidas)
+
+
+def _argumentos_textos(p):
+    p.add_argument("--textos", default=settings.textos_ocr_dir)
+    p.add_argument("--desde", help="primer boletín (fecha)")
+    p.add_argument("--hasta", help="último boletín (fecha)")
+    p.add_argument("--procesos", type=int, default=settings.procesos_ocr, help="0 = en línea")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando")
+
+    p = sub.add_parser("discover", help="listado de boletines -> JSONL (fecha, url)")
+    p.add_argument("--salida", default="boletines.jsonl")
+    p.add_argument("--desde", help="fecha inicial (por defecto FILTRADO_INI)")
+    p.add_argument("--hasta", help="fecha final (por defecto FILTRADO_FIN)")
+    p.add_argument("--pendientes", action="store_true", help="quita los ya TERMINADO (requiere la base)")
+    p.set_defaults(funcion=cmd_discover)
+
+    p = sub.add_parser("fetch", help="descarga las imágenes al archivo local (.pack/.idx)")
+    p.add_argument("--entrada", default="boletines.jsonl")
+    p.add_argument("--salida", default="descargados.jsonl")
+    p.add_argument("--archivo", default=settings.archivo_dir)
+    p.set_defaults(funcion=cmd_fetch)
+
+    p = sub.add_parser("ocr", help="OCR de las imágenes del archivo -> textos por boletín (textos_ocr)")
+    p.add_argument("--entrada", default="descargados.jsonl")
+    p.add_argument("--archivo", default=settings.archivo_dir)
+    p.add_argument("--textos", default=settings.textos_ocr_dir)
+    p.add_argument("--rehacer", action="store_true",
+                   help="vuelve a reconocer todo (si no, completa lo guardado y las páginas prefiltradas)")
+    p.set_defaults(funcion=cmd_ocr)
+
+    p = sub.add_parser("parse", help="textos -> JSONL de expedientes (sin base)")
+    _argumentos_textos(p)
+    p.add_argument("--salida", default="expedientes.jsonl")
+    p.set_defaults(funcion=cmd_parse)
+
+    p = sub.add_parser("reparse", help="parser actual sobre los textos guardados vs. la base (diff o reemplazo)")
+    _argumentos_textos(p)
+    p.add_argument("--reemplazar", action="store_true",
+                   help="borra y vuelve a cargar los expedientes de cada boletín (si no, solo diff)")
+    p.add_argument("--salida", help="JSONL con las diferencias (cambio +/-)")
+    p.set_defaults(funcion=cmd_reparse)
+
+    p = sub.add_parser("load", help="inserta el JSONL de expedientes en la base")
+    p.add_argument("--entrada", default="expedientes.jsonl")
+    p.add_argument("--lote", type=int, default=5000)
+    p.set_defaults(funcion=cmd_load)
+
+    p = sub.add_parser("depurar", help="respalda en JSONL los expedientes repetidos y, con --aplicar, los borra")
+    p.add_argument("--salida", default="expedientes_repetidos.jsonl")
+    p.add_argument("--aplicar", action="store_true", help="borra los repetidos y crea el índice único")
+    p.set_defaults(funcion=cmd_depurar)
+
+    p = sub.add_parser("run", help="todo el flujo contra la base (descubrir -> ... -> cargar)")
+    p.set_defaults(funcion=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    funcion = getattr(args, "funcion", cmd_run)
+
+    from telemetria import configurar_logs, escribir_prometheus, totales as totales_telemetria
+
+    configurar_logs(settings.log_level)
+    codigo = funcion(args)
+
+    if settings.telemetria_activa:
+        escribir_prometheus()
+        print("Telemetría por etapa:", totales_telemetria())
+    return codigo or 0
+
+
+# El guard es necesario: el pool de procesos re-importa este módulo en cada worker
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import re
+import unicodedata
+
+# Normalización del texto OCR en una sola pasada por etapa.
+# Todos los patrones son de módulo (se compilan una vez).
+
+# Comillas raras del OCR -> ' y "
+# (str.translate con tabla resultó ~70x más lento que replace en el corpus: en texto
+# no-ASCII hace una búsqueda en el dict por carácter; replace es memchr en C)
+_COMILLAS = (
+    ("‘", "'"),
+    ("’", "'"),
+    ("´", "'"),
+    ("“", '"'),
+    ("”", '"'),
+)
+
+# "vs" / "T.Ap" / "T." en una sola alternancia; el grupo que matchea decide el reemplazo
+RE_REESCRITURAS = re.compile(
+    r"(?P<vs>\bvs\b(?:\s*\.)?)"
+    r"|(?P<tap>T\s*\.\s*Ap\s*\.|T\s*\.?\s*Ap\b)"
+    r"|(?P<t>T\s*\.)",
+    re.IGNORECASE,
+)
+
+_REEMPLAZOS = {
+    "vs": "vs.",
+    "tap": "T.Ap",
+    "t": "T.",
+}
+
+
+def _reemplazar(m: re.Match) -> str:
+    return _REEMPLAZOS[m.lastgroup]
+
+
+def plegar_comillas(s: str) -> str:
+    if s.isascii():
+        return s
+    for rara, normal in _COMILLAS:
+        s = s.replace(rara, normal)
+    return s
+
+
+def colapsar_espacios(s: str) -> str:
+    # Equivale a re.sub(r"\s+", " ", s).strip()
+    return " ".join(s.split())
+
+
+def normalizar_bloque(text: str) -> str:
+    """
+    Espacios (incluye \\r y \\n) con split/join, comillas y luego vs / T.Ap / T.
+    en una sola pasada de regex. Mismo resultado que la cadena de replace + re.sub anterior.
+    """
+    t = plegar_comillas(colapsar_espacios(text))
+    return RE_REESCRITURAS.sub(_reemplazar, t)
+
+
+# Encabezados de página que se cuelan al inicio del nombre del actor
+RE_ENC_ACUERDOS = re.compile(r"^.*?\bACUERDOS\s+DEL\b\s+.*?\b\d{4}\b\s+", re.IGNORECASE)
+RE_ENC_BOLETIN = re.compile(r"^.*?\bBOLETIN\b.*?\b\d{4}\b\s+", re.IGNORECASE)
+RE_ENC_SALA = re.compile(r"^.*?\b(PRIMERA|SEGUNDA|TERCERA)\s+SALA\b.*?\b\d{4}\b\s+", re.IGNORECASE)
+RE_DIAS = re.compile(r"\b(Lunes|Martes|Mi[eé]rcoles|Jueves|Viernes|S[aá]bado|Domingo)\b", re.IGNORECASE)
+RE_ANIO = re.compile(r"\b\d{4}\b")
+RE_HASTA_ANIO = re.compile(r"^.*?\b\d{4}\b\s+", re.IGNORECASE)
+RE_PREFIJO_OCR = re.compile(r"^\s*(?:lo|l0|I0|IO|I|l)\.?\s*\d+\s*", re.IGNORECASE)
+RE_PREFIJO_AS = re.compile(r"^\s*AS\s+", re.IGNORECASE)
+
+
+def quitar_encabezados(s: str) -> str:
+    u = s.strip()
+
+    # Encabezados típicos
+    u = RE_ENC_ACUERDOS.sub("", u, count=1)
+    u = RE_ENC_BOLETIN.sub("", u, count=1)
+    u = RE_ENC_SALA.sub("", u, count=1)
+
+    # Basura tipo "lo. 3 Viernes 9 de enero del 2026 ..."
+    if RE_DIAS.search(u) and RE_ANIO.search(u):
+        u = RE_HASTA_ANIO.sub("", u, count=1)
+
+    # Prefijos OCR comunes
+    u = RE_PREFIJO_OCR.sub("", u, count=1)
+    u = RE_PREFIJO_AS.sub("", u, count=1)
+
+    return u.strip()
+
+
+class _TablaSinAcentos(dict):
+    # Tabla para str.translate que se llena sola: NFKD del carácter sin marcas combinantes.
+    # Como las marcas se descartan, hacerlo carácter por carácter da lo mismo que sobre
+    # la cadena completa.
+    def __missing__(self, codigo: int) -> str:
+        descompuesto = unicodedata.normalize("NFKD", chr(codigo))
+        limpio = "".join(c for c in descompuesto if not unicodedata.combining(c))
+        self[codigo] = limpio
+        return limpio
+
+
+_SIN_ACENTOS = _TablaSinAcentos()
+
+
+def normalizar_fechas(s: str) -> str:
+    # quita acentos, normaliza espacios y pasa a minúsculas
+    if not s.isascii():
+        s = s.translate(_SIN_ACENTOS)
+    return colapsar_espacios(s).lower()
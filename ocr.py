@@ -0,0 +1,77 @@
+import threading
+import numpy as np
+import pytesseract
+
+from configuration import settings
+
+# Motor persistente opcional (libtesseract). Si no está instalado se usa pytesseract.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
+
+# Un motor por hilo/proceso: PyTessBaseAPI no es thread-safe
+_local = threading.local()
+
+
+def config_tesseract(psm: int | None = None) -> str:
+    return f"--psm {psm or settings.ocr_psm} --oem {settings.ocr_oem}"
+
+
+def firma_ocr() -> str:
+    # Identifica la configuración de OCR (para la caché de resultados)
+    return f"{settings.ocr_lang}:{config_tesseract()}"
+
+
+def usar_motor_persistente() -> bool:
+    backend = settings.ocr_backend
+    if backend == "pytesseract":
+        return False
+    if tesserocr is None:
+        if backend == "tesserocr":
+            raise RuntimeError("OCR_BACKEND=tesserocr pero tesserocr no está instalado")
+        return False
+    return True
+
+
+def obtener_motor():
+    motor = getattr(_local, "motor", None)
+    if motor is None:
+        kwargs = {"lang": settings.ocr_lang, "psm": settings.ocr_psm, "oem": settings.ocr_oem}
+        if settings.ocr_tessdata:
+            kwargs["path"] = settings.ocr_tessdata
+        # Aquí se cargan los modelos de idioma (una sola vez por worker)
+        motor = tesserocr.PyTessBaseAPI(**kwargs)
+        _local.motor = motor
+    return motor
+
+
+def inicializar_motor():
+    # initializer para los pools: deja el motor cargado antes de la primera página
+    if usar_motor_persistente():
+        obtener_motor()
+
+
+def reconocer(img, psm: int | None = None) -> str:
+    """
+    OCR de un ndarray (gris o BGR, uint8).
+    Con tesserocr la imagen se pasa directo en memoria al motor ya cargado;
+    con pytesseract se lanza el ejecutable de tesseract (fallback).
+    """
+    if not usar_motor_persistente():
+        return pytesseract.image_to_string(
+            img,
+            lang=settings.ocr_lang,
+            config=config_tesseract(psm)
+        )
+
+    motor = obtener_motor()
+    img = np.ascontiguousarray(img)
+    h, w = img.shape[:2]
+    bpp = 1 if img.ndim == 2 else img.shape[2]
+
+    motor.SetPageSegMode(psm or settings.ocr_psm)
+    motor.SetImageBytes(img.tobytes(), w, h, bpp, w * bpp)
+    return motor.GetUTF8Text()
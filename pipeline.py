@@ -0,0 +1,281 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from images import descargar_imagen, ocr_pagina, ocr_pagina_columna, tomar_escala
+from extractor_js import obtener_inicio_columnas, extraer_fecha_y_numero_boletin, extraer_indice_secciones
+from text_extractor import parsear_pagina
+from ocr import inicializar_motor
+from prefiltro import ocr_con_prefiltro
+from telemetria import etapa, capturar, fusionar
+
+# En modo debug solo se procesan las primeras páginas del boletín
+LIMITE_PAGINAS_DEBUG = 15
+
+
+def _mapa_ordenado(executor, fn, elementos, limite):
+    """
+    Aplica fn a cada elemento y entrega los resultados en el MISMO orden de entrada.
+    Nunca hay más de `limite` tareas pendientes (cola acotada entre etapas).
+    Sin executor se ejecuta en línea (modo secuencial).
+    """
+    if executor is None:
+        for e in elementos:
+            yield fn(e)
+        return
+
+    pendientes = deque()
+    for e in elementos:
+        pendientes.append(executor.submit(fn, e))
+        if len(pendientes) >= limite:
+            yield pendientes.popleft().result()
+
+    while pendientes:
+        yield pendientes.popleft().result()
+
+
+def _es_404(error) -> bool:
+    respuesta = getattr(error, "response", None)
+    return respuesta is not None and respuesta.status_code == 404
+
+
+def _obtener_imagen(session, archivo, idx, url_thumb, url_directa=None):
+    # Primero el archivo local; si no está, url directa (si hay) o thumb -> url de la imagen -> bytes
+    if archivo is not None:
+        with etapa("archivo") as m:
+            contenido = archivo.leer(idx)
+            if contenido is not None:
+                m.bytes, m.paginas = len(contenido), 1
+        if contenido is not None:
+            return f"{archivo.ruta}#{idx}", contenido
+
+    contenido = None
+    if url_directa:
+        try:
+            url_img = url_directa
+            contenido = descargar_imagen(session, url_directa)
+        except Exception as e:
+            # Solo el 404 cae al thumb; cualquier otro error se propaga igual que antes
+            if not _es_404(e):
+                raise
+
+    if contenido is None:
+        with etapa("thumb") as m:
+            url_img = session.get(url_thumb, timeout=30).text
+            m.bytes = len(url_img)
+        contenido = descargar_imagen(session, url_img)
+    if archivo is not None:
+        archivo.guardar(idx, contenido)
+    return url_img, contenido
+
+
+def _descargar_pagina(tarea):
+    # Etapa de red (hilos): bytes de la imagen en memoria
+    session, archivo, idx, url_thumb, url_directa, columnas, volcar = tarea
+    with capturar() as muestras:
+        url_img, contenido = _obtener_imagen(session, archivo, idx, url_thumb, url_directa)
+    return idx, url_img, contenido, columnas, volcar, True, muestras
+
+
+def datos_pagina(escala=None, prefiltrada=False) -> dict:
+    """
+    Lo que se guarda de la página junto a su texto (textos_ocr):
+    - escala, altura: escala OCR elegida y altura de letra medida (images.tomar_escala)
+    - prefiltrada: descartada por el prefiltro sin OCR completo (texto "" no es "sin texto")
+    """
+    datos = {}
+    if escala is not None:
+        datos["escala"], datos["altura"] = escala
+    if prefiltrada:
+        datos["prefiltrada"] = True
+    return datos
+
+
+def _ocr_pagina(tarea):
+    # Etapa de CPU (procesos): preprocesado + OCR, sin pasar por disco.
+    # Regresa también datos_pagina (escala elegida, si el prefiltro la descartó)
+    idx, url_img, contenido, columnas, volcar, usar_prefiltro = tarea
+    tomar_escala()
+    with capturar() as muestras:
+        if columnas:
+            # Las columnas pasan antes por el prefiltro barato (si está activo)
+            texto = ocr_con_prefiltro(contenido, idx, volcar, ocr_pagina_columna, usar_prefiltro)
+        else:
+            texto = ocr_pagina(contenido, idx, volcar)
+    datos = datos_pagina(tomar_escala(), prefiltrada=texto is None)
+    return idx, url_img, texto or "", columnas, datos, muestras
+
+
+def _con_telemetria(resultados):
+    # Las muestras de telemetría de los workers llegan con cada resultado; se registran
+    # aquí, en el hilo del boletín, para que cuenten en su resumen
+    for *resultado, muestras in resultados:
+        fusionar(muestras)
+        yield tuple(resultado)
+
+
+def crear_ejecutores(hilos, procesos):
+    # Pools de descarga (hilos) y OCR (procesos); None = esa etapa corre en línea
+    hilos_pool = ThreadPoolExecutor(max_workers=hilos) if hilos > 0 else None
+    procesos_pool = ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_motor) if procesos > 0 else None
+    return hilos_pool, procesos_pool
+
+
+def cerrar_ejecutores(ejecutores):
+    for pool in ejecutores:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def paginas_a_procesar(paginas, debug=False):
+    # En debug solo las primeras LIMITE_PAGINAS_DEBUG
+    return paginas[:LIMITE_PAGINAS_DEBUG] if debug else paginas
+
+
+def _claves(palabras):
+    return [c.strip().upper() for c in palabras if c.strip()]
+
+
+def _paginas_de(secciones, claves):
+    # Páginas de las secciones cuyo nombre contiene alguna de las claves
+    paginas = set()
+    for seccion in secciones:
+        if any(c in seccion["nombre"] for c in claves):
+            paginas.update(range(seccion["desde"], seccion["hasta"] + 1))
+    return paginas
+
+
+def planear_paginas(texto_portada, total_paginas, inicio_columnas, incluir_previas=False,
+                    incluidas=(), excluidas=()):
+    """
+    Páginas (índices del visor, >= 2) que hay que descargar y pasar por OCR.
+    - Solo las columnas (idx >= inicio_columnas) alimentan a parse_arrendamiento_block;
+      las anteriores solo se quieren para las transcripciones de debug (incluir_previas).
+    - Sin incluir_previas el plan sale del índice de la portada: las páginas de las
+      secciones cuyo nombre contiene alguna palabra de `incluidas` (las que traen los
+      juicios de arrendamiento, p. ej. "SALA", "CIVIL", "ARRENDAMIENTO").
+    - Si el índice no se pudo leer o ninguna sección coincide, se usan todas las columnas.
+    - Al final se quitan las secciones que contienen alguna palabra de `excluidas`.
+    Regresa (lista de índices en orden, secciones del índice).
+    """
+    secciones = extraer_indice_secciones(texto_portada, total_paginas) if texto_portada else []
+
+    if incluir_previas:
+        return list(range(2, total_paginas + 1)), secciones
+
+    columnas = set(range(max(inicio_columnas, 2), total_paginas + 1))
+    plan = _paginas_de(secciones, _claves(incluidas)) & columnas or columnas
+    plan -= _paginas_de(secciones, _claves(excluidas))
+    return sorted(plan), secciones
+
+
+def procesar_portada(session, paginas, archivo=None, volcar_imagenes=False):
+    """
+    OCR de la página 1: de ella salen fecha, número de boletín e inicio de columnas.
+    Regresa (texto, contexto) con contexto = (fecha_pub, num_boletin, inicio_columnas).
+    """
+    url_img, contenido = _obtener_imagen(session, archivo, 1, paginas[0]["thumb"], paginas[0].get("directa"))
+    print(f"OCR página {url_img}")
+    texto = ocr_pagina(contenido, 1, volcar_imagenes)
+    return texto, contexto_portada(texto)
+
+
+def contexto_portada(texto):
+    # (fecha_pub, num_boletin, inicio_columnas) a partir del texto de la página 1
+    with etapa("parseo", paginas=1):
+        # Si no se encuentra "SALAS n" todo el resto se trata como columnas
+        inicio_columnas = obtener_inicio_columnas(texto) or 1
+        fecha_pub, num_boletin = extraer_fecha_y_numero_boletin(texto)
+    return fecha_pub, num_boletin, inicio_columnas
+
+
+
+def iterar_paginas(session, paginas, contexto, desde=2, tam_cola=1, volcar_imagenes=False,
+                   archivo=None, ejecutores=(None, None), plan=None):
+    """
+    Genera (idx, texto, registros, datos) para las páginas idx >= desde, EN ORDEN;
+    datos = datos_pagina (escala OCR, altura de letra, prefiltrada).
+    Con `plan` (ver planear_paginas) solo las páginas del plan; las demás ni se descargan.
+    Cada página pasa por descarga (hilos) -> preprocesado + OCR (procesos) -> parseo,
+    con a lo más `tam_cola` tareas pendientes por etapa. Sin pools corre secuencial.
+    """
+    inicio_columnas = contexto[2]
+    desde = max(desde, 2)
+    plan = set(plan) if plan is not None else None
+
+    tareas = (
+        (session, archivo, idx, p["thumb"], p.get("directa"), idx >= inicio_columnas, volcar_imagenes)
+        for idx, p in enumerate(paginas, start=1)
+        if idx >= desde and (plan is None or idx in plan)
+    )
+
+    limite = max(tam_cola, 1)
+    hilos_pool, procesos_pool = ejecutores
+    descargadas = _con_telemetria(_mapa_ordenado(hilos_pool, _descargar_pagina, tareas, limite))
+    reconocidas = _con_telemetria(_mapa_ordenado(procesos_pool, _ocr_pagina, descargadas, limite))
+
+    for idx, url_img, texto, columnas, datos in reconocidas:
+        print(f"OCR página {url_img}")
+        yield idx, texto, parsear_pagina(texto, contexto, idx, columnas), datos
+
+
+def iterar_textos_archivo(archivo, plan, inicio_columnas, procesos_pool=None, tam_cola=1, volcar_imagenes=False,
+                          sin_prefiltro=()):
+    """
+    Genera (idx, texto, columnas, datos) de las páginas `plan` ya guardadas en `archivo`
+    (ArchivoBoletin), EN ORDEN, sin red: solo preprocesado + OCR (procesos).
+    Las páginas que no están en el archivo se saltan; las de `sin_prefiltro` van directo
+    al OCR completo.
+    """
+    tareas = (
+        (idx, f"{archivo.ruta}#{idx}", archivo.leer(idx), idx >= inicio_columnas, volcar_imagenes,
+         idx not in sin_prefiltro)
+        for idx in plan
+        if idx in archivo
+    )
+    reconocidas = _con_telemetria(_mapa_ordenado(procesos_pool, _ocr_pagina, tareas, max(tam_cola, 1)))
+    for idx, _, texto, columnas, datos in reconocidas:
+        yield idx, texto, columnas, datos
+
+
+def procesar_paginas(session, paginas, debug=False, hilos=0, procesos=0, tam_cola=1, volcar_imagenes=False,
+                     archivo=None, ejecutores=None, excluidas=()):
+    """
+    Procesa en memoria todas las páginas de un boletín (salida de extraer_paginas_js).
+    - La página 1 se procesa primero (procesar_portada), el resto con iterar_paginas.
+    - El orden de las páginas y el numero_pagina asignado son deterministas.
+    - Las imágenes solo tocan disco si se pide volcar_imagenes (debug).
+    - Con `archivo` (ArchivoBoletin) las imágenes se leen del pack local antes de ir
+      a la red, y las descargadas se agregan al pack.
+    - Con `ejecutores` (ver crear_ejecutores) se usan pools compartidos con otros boletines;
+      `tam_cola` es entonces la cuota de tareas pendientes de este boletín en cada pool.
+    - Fuera de debug solo se procesan las páginas del plan (planear_paginas).
+    Regresa (expedientes, textos, total_paginas).
+    """
+    expedientes = []
+    textos = []
+
+    paginas = paginas_a_procesar(paginas, debug)
+    if not paginas:
+        return expedientes, textos, 0
+
+    texto, contexto = procesar_portada(session, paginas, archivo, volcar_imagenes)
+    textos.append(texto)
+    plan, _ = planear_paginas(texto, len(paginas), contexto[2], incluir_previas=debug, excluidas=excluidas)
+
+    propios = ejecutores is None
+    if propios:
+        ejecutores = crear_ejecutores(hilos, procesos)
+
+    try:
+        for _, texto, registros, _ in iterar_paginas(
+            session, paginas, contexto,
+            tam_cola=tam_cola, volcar_imagenes=volcar_imagenes,
+            archivo=archivo, ejecutores=ejecutores, plan=plan,
+        ):
+            expedientes.extend(registros)
+            textos.append(texto)
+    finally:
+        if propios:
+            cerrar_ejecutores(ejecutores)
+
+    return expedientes, textos, len(paginas)
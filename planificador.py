@@ -0,0 +1,265 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from configuration import settings
+from redirection import obtener_url_redireccion
+from extractor_js import extraer_paginas_js, agregar_urls_directas
+from pipeline import (
+    paginas_a_procesar, procesar_portada, planear_paginas, iterar_paginas,
+    crear_ejecutores, cerrar_ejecutores, datos_pagina,
+)
+from images import tomar_escala
+from archivo_paginas import ArchivoBoletin
+from repository import (
+    filtrar_no_procesados, recordar_procesado, llaves_expedientes,
+    iniciar_procesamiento_boletin, guardar_avance, terminar_procesamiento_boletin,
+)
+from scraper import EscritorTranscripcion
+from telemetria import etapa, contar, muestrear_rss, boletin as telemetria_boletin
+from dedup import IndiceDedup
+from textos_ocr import EscritorTextos, ruta_textos
+
+
+def ordenar_por_prioridad(externos, prioridad: str = "recientes"):
+    # recientes: el boletín más nuevo primero; antiguos: orden cronológico
+    return sorted(externos, key=lambda e: e[0], reverse=(prioridad != "antiguos"))
+
+
+def crear_indice_dedup(pendientes) -> IndiceDedup:
+    # Precarga las llaves ya cargadas en la ventana de fechas de los boletines pendientes
+    indice = IndiceDedup()
+    fechas = [fecha for fecha, _ in pendientes]
+    if fechas:
+        ini, fin = min(fechas), max(fechas)
+        indice.precargar(llaves_expedientes(ini, fin))
+        print(f"Índice de expedientes: {len(indice)} llaves precargadas ({ini}..{fin})")
+    return indice
+
+
+def _guardar(id_proc, ultima, pendientes, contexto, dedup):
+    """
+    guardar_avance con los registros ya filtrados por el índice de dedup (si hay).
+    Regresa (insertadas, omitidas, guardados, suprimidos).
+    """
+    if dedup is None:
+        insertadas, omitidas = guardar_avance(id_proc, ultima, pendientes, *contexto)
+        return insertadas, omitidas, len(pendientes), 0
+
+    nuevos, hashes = dedup.filtrar(pendientes)
+    suprimidos = len(pendientes) - len(nuevos)
+    contar("dedup_suprimido", suprimidos)
+    try:
+        insertadas, omitidas = guardar_avance(id_proc, ultima, nuevos, *contexto)
+    except Exception:
+        dedup.descartar(hashes)
+        raise
+    return insertadas, omitidas, len(nuevos), suprimidos
+
+
+def procesar_boletin(session, fecha, url, ejecutores=(None, None), cuota=1, dedup=None) -> int:
+    """
+    Procesa un boletín completo: redirección -> páginas -> expedientes -> procesamiento_boletin.
+    - Marca el boletín INICIADO al empezar y TERMINADO al final (aunque no tenga expedientes).
+    - Cada CHECKPOINT_PAGINAS páginas inserta los expedientes y guarda el avance en la misma
+      transacción; si la corrida se cae, la siguiente reanuda desde la última página guardada.
+    - Con `dedup` (IndiceDedup) los expedientes ya cargados (en esta corrida o en la base)
+      se descartan antes de insertarlos.
+    - En memoria solo queda la ventana de páginas en curso (la cuota de los pools) y los
+      expedientes desde el último checkpoint; el texto de cada página se escribe al terminar.
+    Regresa el número de expedientes insertados en esta corrida.
+    La telemetría de todas sus etapas (y el pico de RSS) se resume en una fila por boletín
+    (ver telemetria.py).
+    """
+    with telemetria_boletin(fecha, url) as fila:
+        return _procesar_boletin(session, fecha, url, ejecutores, cuota, dedup, fila)
+
+
+def _procesar_boletin(session, fecha, url, ejecutores, cuota, dedup, fila) -> int:
+    debug = settings.is_debbug
+
+    direccion = obtener_url_redireccion(url)
+    with etapa("visor") as m:
+        html = session.get(direccion, timeout=30).text
+        m.bytes = len(html)
+    paginas = extraer_paginas_js(html)
+    if settings.url_directa:
+        # Con el total real de páginas del visor; se arma antes de recortar en debug
+        agregar_urls_directas(paginas, settings.tam_imagen)
+    paginas = paginas_a_procesar(paginas, debug)
+    total_paginas = len(paginas)
+
+    archivo = ArchivoBoletin(fecha, settings.archivo_dir) if settings.archivo_activo else None
+    # descargado se marca al terminar, según lo que de verdad quedó en el pack
+    id_proc, avance = iniciar_procesamiento_boletin(
+        fecha, url,
+        descargado=False,
+        nombre_archivo=archivo.ruta if archivo is not None else "",
+    )
+    reanudando = avance is not None and settings.reanudar
+
+    # Ningún texto se acumula: cada página va a la transcripción / al almacén al terminar
+    texto_portada = None
+    almacen = None
+    transcripcion = None
+    if debug:
+        # Al reanudar se conserva la transcripción de las páginas anteriores al corte
+        transcripcion = EscritorTranscripcion(f"revision_boletin{fecha.isoformat()}.txt",
+                                              comprimir=settings.transcripcion_comprimida,
+                                              anexar=reanudando)
+    insertadas = 0
+    omitidas = 0
+    suprimidos = 0
+    total_expedientes = 0
+    # Páginas por escala OCR elegida (solo en la fila del boletín, no como etapas)
+    escalas = Counter()
+
+    try:
+        if reanudando:
+            contexto = (avance["fecha_publicacion"], avance["numero_boletin"], avance["inicio_columnas"])
+            desde = avance["ultima_pagina"] + 1
+            total_expedientes = avance["total_expedientes"]
+            fila["reanudado_desde"] = desde
+            print(f"Reanudando {url} desde la página {desde}")
+        elif paginas:
+            texto_portada, contexto = procesar_portada(session, paginas, archivo, settings.volcar_imagenes)
+            escala_portada = tomar_escala()
+            if escala_portada is not None:
+                escalas[escala_portada[0]] += 1
+            if transcripcion is not None:
+                transcripcion.agregar(texto_portada, 1)
+            guardar_avance(id_proc, 1, [], *contexto)
+            desde = 2
+        else:
+            contexto, desde = None, 1
+
+        if contexto is not None:
+            if settings.textos_ocr_activo:
+                # Al reanudar se anexa a lo que ya quedó guardado en la corrida anterior
+                almacen = EscritorTextos(ruta_textos(settings.textos_ocr_dir, fecha), {
+                    "fecha": fecha, "url": url, "total_paginas": total_paginas,
+                    "fecha_pub": contexto[0], "num_boletin": contexto[1], "inicio_columnas": contexto[2],
+                }, anexar=texto_portada is None)
+                if texto_portada is not None:
+                    almacen.agregar(1, texto_portada, False, datos_pagina(escala_portada))
+
+            plan = None
+            if settings.planear_paginas:
+                # Al reanudar no se tiene el texto de la portada: el plan queda en "solo columnas"
+                plan, secciones = planear_paginas(
+                    texto_portada, total_paginas, contexto[2],
+                    incluir_previas=debug, incluidas=settings.secciones_incluidas,
+                    excluidas=settings.secciones_excluidas,
+                )
+                fila.update(paginas_plan=len(plan) + 1, secciones=len(secciones))
+
+            pendientes = []
+            ultima_guardada = desde - 1
+            ultima = ultima_guardada
+
+            for idx, texto, registros, datos in iterar_paginas(
+                session, paginas, contexto, desde=desde,
+                tam_cola=cuota, volcar_imagenes=settings.volcar_imagenes,
+                archivo=archivo, ejecutores=ejecutores, plan=plan,
+            ):
+                if transcripcion is not None:
+                    transcripcion.agregar(texto, idx)
+                if almacen is not None:
+                    almacen.agregar(idx, texto, idx >= contexto[2], datos)
+                if "escala" in datos:
+                    escalas[datos["escala"]] += 1
+                pendientes.extend(registros)
+                ultima = idx
+                muestrear_rss()
+
+                if ultima - ultima_guardada >= settings.checkpoint_paginas:
+                    # El texto de las páginas queda en disco antes de que la base las dé por hechas
+                    if almacen is not None:
+                        almacen.sincronizar()
+                    nuevas, repetidas, guardados, descartados = _guardar(id_proc, ultima, pendientes, contexto, dedup)
+                    insertadas += nuevas
+                    omitidas += repetidas
+                    suprimidos += descartados
+                    total_expedientes += guardados
+                    pendientes = []
+                    ultima_guardada = ultima
+
+            if ultima > ultima_guardada:
+                if almacen is not None:
+                    almacen.sincronizar()
+                nuevas, repetidas, guardados, descartados = _guardar(id_proc, ultima, pendientes, contexto, dedup)
+                insertadas += nuevas
+                omitidas += repetidas
+                suprimidos += descartados
+                total_expedientes += guardados
+    finally:
+        if archivo is not None:
+            archivo.cerrar()
+        if almacen is not None:
+            almacen.cerrar()
+        if transcripcion is not None:
+            transcripcion.cerrar()
+
+    fecha_string = fecha.isoformat()
+
+    terminar_procesamiento_boletin(id_proc, total_paginas, total_expedientes,
+                                   descargado=archivo is not None and len(archivo) > 0)
+    recordar_procesado(fecha, url)
+
+    fila.update(total_paginas=total_paginas, insertadas=insertadas, omitidas=omitidas, suprimidos=suprimidos)
+    if escalas:
+        fila["escalas_ocr"] = {f"x{e}": n for e, n in sorted(escalas.items())}
+    print(f"Boletín {fecha_string}: {total_paginas} páginas, {insertadas} expedientes "
+          f"({omitidas} ya existían, {suprimidos} repetidos descartados)")
+    return insertadas
+
+
+def ejecutar_boletines(session, externos):
+    """
+    Procesa varios boletines a la vez:
+    - a lo más BOLETINES_CONCURRENTES boletines en curso,
+    - en orden de prioridad (PRIORIDAD_BOLETINES, por defecto el más reciente primero),
+    - los pools de descarga y OCR se comparten y cada boletín tiene la misma cuota
+      de tareas pendientes en ellos (reparto justo de los workers),
+    - lo ya TERMINADO se salta (lo INICIADO se reanuda); la revisión es una sola
+      consulta para toda la lista (filtrar_no_procesados),
+    - con DEDUP_ACTIVO todos comparten un IndiceDedup precargado de la base.
+    Los límites por host (token bucket) los aplica el cliente HTTP.
+    """
+    ordenados = ordenar_por_prioridad(externos, settings.prioridad_boletines)
+    pendientes = filtrar_no_procesados(ordenados, usar_cache=settings.cache_procesados)
+    por_procesar = set(pendientes)
+    for fecha, url in ordenados:
+        if (fecha, url) not in por_procesar:
+            print(f"Ya existe {url}")
+
+    if not pendientes:
+        return {}
+
+    concurrentes = max(1, min(settings.boletines_concurrentes, len(pendientes)))
+    cuota = max(1, settings.tam_cola // concurrentes)
+
+    # Sin pipeline: todo en línea, página por página
+    hilos = settings.hilos_descarga if settings.pipeline_activo else 0
+    procesos = settings.procesos_ocr if settings.pipeline_activo else 0
+    dedup = crear_indice_dedup(pendientes) if settings.dedup_activo else None
+    ejecutores = crear_ejecutores(hilos, procesos)
+
+    resultados = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrentes, thread_name_prefix="boletin") as pool:
+            futuros = {
+                pool.submit(procesar_boletin, session, fecha, url, ejecutores, cuota, dedup): (fecha, url)
+                for fecha, url in pendientes
+            }
+            for futuro, (fecha, url) in futuros.items():
+                try:
+                    resultados[(fecha, url)] = futuro.result()
+                except Exception as e:
+                    # Un boletín fallido no detiene a los demás; se reintenta en la siguiente corrida
+                    print(f"Error procesando {url}: {e}")
+    finally:
+        cerrar_ejecutores(ejecutores)
+
+    if dedup is not None:
+        print("Índice de expedientes:", dedup.estadisticas())
+    return resultados
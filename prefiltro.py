@@ -0,0 +1,96 @@
+import re
+
+import cv2
+
+from configuration import settings
+from cache_ocr import ocr_con_cache
+from images import cargar_imagen
+from ocr import reconocer
+from telemetria import etapa, contar
+from text_extractor import RE_ARR
+
+# Prefiltro de dos niveles para las páginas en columnas:
+# 1) OCR barato de la página completa reducida (PREFILTRO_ESCALA), solo para buscar
+#    la palabra "arrendamiento" con tolerancia a errores del OCR de baja resolución.
+# 2) Solo si pasa, el OCR completo por columnas. Si no pasa no hay texto (None): la página
+#    se guarda vacía y marcada "prefiltrada" en el almacén de textos, para que `main.py ocr`
+#    le haga el OCR completo después (un falso negativo del prefiltro se puede recuperar).
+# Con PREFILTRO_MEDIR se corren los dos niveles en todas las páginas y se cuentan
+# aciertos/fallos del prefiltro contra el OCR completo (etapas prefiltro_vp/fn/fp/vn de la
+# telemetría; ver `recall`). Sin red: benchmarks/recall_prefiltro.py sobre el archivo local.
+
+# Trozos de "arrendamiento" que sobreviven a los errores típicos en baja resolución
+# (rr -> n, e -> c, i -> l/1/í); basta con que aparezca uno
+RE_ARR_APROX = re.compile(
+    r"a[rn]{1,2}[ec]nd|rrend|endam|ndam[il1í]|dam[il1í][ec]nt",
+    re.IGNORECASE,
+)
+
+
+def variante_prefiltro() -> str:
+    # Parte de la clave de la caché OCR: cambia si cambia la escala
+    return f"prefiltro:x{settings.prefiltro_escala}"
+
+
+def preprocesar_prefiltro(origen):
+    img = cargar_imagen(origen, cv2.IMREAD_GRAYSCALE)
+    escala = settings.prefiltro_escala
+    if escala != 1:
+        # INTER_AREA: la reducción que mejor conserva los trazos
+        img = cv2.resize(img, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    return cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def texto_prefiltro(contenido) -> str:
+    def calcular():
+        return reconocer(preprocesar_prefiltro(contenido))
+
+    if not isinstance(contenido, (bytes, bytearray)):
+        return calcular()
+    return ocr_con_cache(contenido, variante_prefiltro(), calcular)
+
+
+def pasa_prefiltro(contenido) -> bool:
+    with etapa("prefiltro", paginas=1):
+        return RE_ARR_APROX.search(texto_prefiltro(contenido)) is not None
+
+
+def prefiltro_activo(debug=False) -> bool:
+    # En debug (transcripciones / volcados) se quiere el texto completo de todas las páginas
+    return settings.prefiltro_activo and not debug and not settings.is_debbug
+
+
+def ocr_con_prefiltro(contenido, idx, debug, ocr, usar_prefiltro=True):
+    """
+    ocr(contenido, idx, debug) solo si la página pasa el prefiltro; si no, None
+    (descartada sin OCR completo, distinto de un OCR que no encontró texto).
+    usar_prefiltro=False fuerza el OCR completo (páginas descartadas antes).
+    En modo medición siempre corre el OCR completo y registra el resultado del prefiltro.
+    """
+    if not usar_prefiltro or not prefiltro_activo(debug):
+        return ocr(contenido, idx, debug)
+
+    pasa = pasa_prefiltro(contenido)
+    if not settings.prefiltro_medir:
+        if not pasa:
+            contar("prefiltro_descartada")
+            return None
+        return ocr(contenido, idx, debug)
+
+    texto = ocr(contenido, idx, debug)
+    registrar_medicion(pasa, RE_ARR.search(texto) is not None)
+    return texto
+
+
+def registrar_medicion(pasa: bool, tiene_arrendamiento: bool) -> None:
+    # vp/fn/fp/vn del prefiltro contra el OCR completo; recall = vp / (vp + fn)
+    if tiene_arrendamiento:
+        contar("prefiltro_vp" if pasa else "prefiltro_fn")
+    else:
+        contar("prefiltro_fp" if pasa else "prefiltro_vn")
+
+
+def recall(conteos: dict) -> float | None:
+    # conteos: {"prefiltro_vp": n, "prefiltro_fn": n, ...}
+    vp, fn = conteos.get("prefiltro_vp", 0), conteos.get("prefiltro_fn", 0)
+    return round(vp / (vp + fn), 4) if vp + fn else None
@@ -2,14 +2,17 @@ import re
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from http_cliente import obtener_cliente, USER_AGENT, REINTENTOS_TOTAL, REINTENTOS_BACKOFF, REINTENTOS_ESTADOS
+from telemetria import etapa
 
 def crear_sesion():
+    # Sesión requests clásica; el scraper usa http_cliente.obtener_cliente()
     session = requests.Session()
 
     retries = Retry(
-        total=5,
-        backoff_factor=2,
-        status_forcelist=[429, 500, 502, 503, 504],
+        total=REINTENTOS_TOTAL,
+        backoff_factor=REINTENTOS_BACKOFF,
+        status_forcelist=list(REINTENTOS_ESTADOS),
         allowed_methods=["GET"]
     )
 
@@ -19,7 +22,7 @@ def crear_sesion():
     session.mount("https://", adapter)
 
     session.headers.update({
-        "User-Agent": "Mozilla/5.0"
+        "User-Agent": USER_AGENT
     })
 
     return session
@@ -34,6 +37,14 @@ def extraer_url_redireccion(html):
 
     return None
 
+def obtener_url_redireccion(url):
+    # Descarga la página del boletín (cliente compartido) y regresa la url del visor
+    with etapa("redireccion") as m:
+        r = obtener_cliente().get(url, timeout=30)
+        m.bytes = len(r.content)
+    r.raise_for_status()
+    return extraer_url_redireccion(r.text)
+
 def obtener_visor_desde_thumb(html):
     match = re.search(
         r"window\.location\s*=\s*['\"]([^'\"]+)['\"]",
@@ -0,0 +1,116 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from telemetria import capturar, fusionar
+from text_extractor import parsear_pagina, numero_pagina
+from textos_ocr import leer_textos, contexto, pendientes_ocr
+
+# Re-parseo sin red ni OCR sobre el almacén de textos (textos_ocr):
+# las páginas de todos los boletines se reparten en lotes a un pool de procesos, cada
+# worker corre el parser actual y los expedientes se juntan de nuevo por boletín.
+# Luego se comparan contra lo que hay en la base (diff) o se reemplazan.
+
+# Páginas por tarea del pool: amortiza el envío entre procesos sin dejar workers ociosos
+TAM_LOTE = 32
+
+# Columnas con las que se compara un expediente re-parseado contra el de la base
+COLUMNAS_DIFF = (
+    "id_expediente", "actor_demandante", "demandado", "tipo_juicio",
+    "fecha_publicacion", "numero_boletin", "numero_pagina", "estatus",
+)
+
+
+def _parsear_lote(lote):
+    # Worker: [(texto, contexto, idx, columnas), ...] -> [registros por página], muestras
+    with capturar() as muestras:
+        registros = [parsear_pagina(texto, ctx, idx, columnas) for texto, ctx, idx, columnas in lote]
+    return registros, muestras
+
+
+def _lotes(boletines, tam_lote):
+    # (posición del boletín, lote de páginas) en orden; solo las páginas que se parsean
+    for i, (encabezado, paginas) in enumerate(boletines):
+        ctx = contexto(encabezado)
+        lote = []
+        for p in paginas:
+            if p["pagina"] < 2 or not p["columnas"] or p.get("prefiltrada"):
+                continue
+            lote.append((p["texto"], ctx, p["pagina"], True))
+            if len(lote) >= tam_lote:
+                yield i, lote
+                lote = []
+        if lote:
+            yield i, lote
+
+
+def reparsear(rutas, procesos: int = 0, tam_lote: int = TAM_LOTE) -> list[tuple[dict, list[dict], list[int]]]:
+    """
+    Parsea de nuevo los boletines guardados en `rutas` (archivos de textos_ocr).
+    Regresa [(encabezado, expedientes, paginas)] en el orden de `rutas`, con los expedientes
+    en el orden de sus páginas; `paginas` son los numero_pagina que cubre el almacén
+    (solo esos se pueden comparar o reemplazar en la base). procesos=0 corre en línea.
+    """
+    boletines = []
+    for ruta in rutas:
+        encabezado, paginas = leer_textos(ruta)
+        if encabezado is None:
+            print(f"Sin encabezado, se omite: {ruta}")
+            continue
+        pendientes = pendientes_ocr(paginas)
+        if pendientes:
+            # Sin OCR completo no hay nada que re-parsear; tampoco cuentan como cubiertas
+            print(f"{ruta}: {len(pendientes)} páginas descartadas por el prefiltro sin OCR completo "
+                  f"(se completan con `main.py ocr`)")
+        boletines.append((encabezado, paginas))
+
+    resultado = [
+        (encabezado, [], [
+            numero_pagina(p["pagina"]) for p in paginas
+            if p["pagina"] >= 2 and p["columnas"] and not p.get("prefiltrada")
+        ])
+        for encabezado, paginas in boletines
+    ]
+    tareas = list(_lotes(boletines, tam_lote))
+    lotes = [lote for _, lote in tareas]
+
+    if procesos > 0 and len(lotes) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            salidas = list(pool.map(_parsear_lote, lotes))
+    else:
+        salidas = [_parsear_lote(lote) for lote in lotes]
+
+    for (i, _), (por_pagina, muestras) in zip(tareas, salidas):
+        fusionar(muestras)
+        for registros in por_pagina:
+            resultado[i][1].extend(registros)
+    return resultado
+
+
+def _llave_diff(reg: dict) -> tuple:
+    return tuple(
+        v.isoformat() if hasattr(v, "isoformat") else v
+        for v in (reg.get(c) for c in COLUMNAS_DIFF)
+    )
+
+
+def diferencias(nuevos: list[dict], actuales: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    (agregados, quitados): lo que el parser actual produce y la base no tiene, y al revés.
+    Compara como multiconjuntos (un expediente repetido cuenta tantas veces como aparece).
+    """
+    conteo_nuevos = Counter(_llave_diff(r) for r in nuevos)
+    conteo_actuales = Counter(_llave_diff(r) for r in actuales)
+
+    def tomar(registros, sobrantes):
+        salida = []
+        for r in registros:
+            llave = _llave_diff(r)
+            if sobrantes[llave] > 0:
+                sobrantes[llave] -= 1
+                salida.append(r)
+        return salida
+
+    return (
+        tomar(nuevos, conteo_nuevos - conteo_actuales),
+        tomar(actuales, conteo_actuales - conteo_nuevos),
+    )
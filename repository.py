@@ -1,6 +1,8 @@
-from sqlalchemy import text
+import threading
+from sqlalchemy import text, bindparam
 from datetime import date
-from db import engine  
+import db
+from telemetria import etapa
 
 def insertar_expediente(data: dict) -> int:
     sql = text("""
@@ -17,13 +19,10 @@ def insertar_expediente(data: dict) -> int:
         returning id;
     """)
 
-    with engine.begin() as conn:  
+    with db.engine.begin() as conn:  
         new_id = conn.execute(sql, data).scalar_one()
         return new_id
 
-from datetime import date
-from sqlalchemy import text
-from db import engine
 
 def insertar_procesamiento_boletin(
     fecha_boletin: date,
@@ -46,7 +45,7 @@ def insertar_procesamiento_boletin(
         );
     """)
 
-    with engine.begin() as conn:
+    with db.engine.begin() as conn:
         conn.execute(sql, {
             "fecha_boletin": fecha_boletin,
             "url_boletin": url_boletin,
@@ -63,20 +62,99 @@ def actualizar_total_paginas(id_procesamiento: int, total_paginas: int) -> None:
         set total_paginas = :total_paginas
         where id = :id;
     """)
-    with engine.begin() as conn:
+    with db.engine.begin() as conn:
         conn.execute(sql, {"id": id_procesamiento, "total_paginas": total_paginas})
 
 def existe_procesamiento(fecha_boletin: date, url_boletin: str) -> bool:
+    # Solo cuenta como procesado si terminó; los INICIADO se reanudan
     sql = text("""
         select 1
         from procesamiento_boletin
         where fecha_boletin = :fecha
           and url_boletin = :url
+          and estado = 'TERMINADO'
         limit 1;
     """)
-    with engine.connect() as conn:
+    with db.engine.connect() as conn:
         return conn.execute(sql, {"fecha": fecha_boletin, "url": url_boletin}).first() is not None
 
+# Caché en proceso de boletines TERMINADO (para modos que corren mucho tiempo)
+_procesados: set[tuple[date, str]] = set()
+_procesados_lock = threading.Lock()
+
+SQL_CREAR_LLAVE_PROCESAMIENTO = text("""
+create unique index if not exists ux_procesamiento_boletin_llave
+on procesamiento_boletin (fecha_boletin, url_boletin);
+""")
+
+# Bases anteriores pueden tener varias filas por boletín (un boletín con error o
+# reprocesado creaba otra); ahí el índice único no se puede crear
+SQL_EXISTE_LLAVE_PROCESAMIENTO = text("""
+select 1 from pg_indexes
+where tablename = 'procesamiento_boletin' and indexname = 'ux_procesamiento_boletin_llave';
+""")
+
+SQL_REPETIDOS_PROCESAMIENTO = text("""
+select count(*) from (
+    select 1 from procesamiento_boletin
+    group by fecha_boletin, url_boletin
+    having count(*) > 1
+) r;
+""")
+
+# Índice normal para la consulta de filtrar_no_procesados cuando no se puede el único
+SQL_CREAR_INDICE_PROCESAMIENTO = text("""
+create index if not exists ix_procesamiento_boletin_llave
+on procesamiento_boletin (fecha_boletin, url_boletin);
+""")
+
+def filtrar_no_procesados(externos, usar_cache: bool = False) -> list[tuple[date, str]]:
+    """
+    Recibe la lista (fecha, url) de extraer_externos y regresa, en el mismo orden,
+    solo los boletines que no están TERMINADO. En postgres es una sola consulta
+    (unnest de arreglos contra procesamiento_boletin).
+    """
+    candidatos = []
+    vistos = set()
+    with _procesados_lock:
+        for e in externos:
+            e = (e[0], e[1])
+            if e in vistos or (usar_cache and e in _procesados):
+                continue
+            vistos.add(e)
+            candidatos.append(e)
+
+    if not candidatos:
+        return []
+
+    if db.engine.dialect.name == "postgresql":
+        sql = text("""
+            select e.fecha, e.url
+            from unnest(cast(:fechas as date[]), cast(:urls as text[])) as e(fecha, url)
+            join procesamiento_boletin p
+              on p.fecha_boletin = e.fecha
+             and p.url_boletin = e.url
+            where p.estado = 'TERMINADO';
+        """)
+        with db.engine.connect() as conn:
+            filas = conn.execute(sql, {
+                "fechas": [f for f, _ in candidatos],
+                "urls": [u for _, u in candidatos],
+            })
+            procesados = {(f, u) for f, u in filas}
+    else:
+        procesados = {e for e in candidatos if existe_procesamiento(*e)}
+
+    if usar_cache:
+        with _procesados_lock:
+            _procesados.update(procesados)
+
+    return [e for e in candidatos if e not in procesados]
+
+def recordar_procesado(fecha_boletin: date, url_boletin: str) -> None:
+    with _procesados_lock:
+        _procesados.add((fecha_boletin, url_boletin))
+
 SQL_INSERT_EXPEDIENTES = text("""
 insert into expedientes (
   id_expediente, actor_demandante, demandado, tipo_juicio,
@@ -110,21 +188,354 @@ def normalizar_registro(reg: dict) -> dict:
 # def insertar_expedientes_bulk(registros: list[dict], batch_size: int = 1000):
 #     registros_norm = [normalizar_registro(r) for r in registros]
 
-#     with engine.begin() as conn:
+#     with db.engine.begin() as conn:
 #         for i in range(0, len(registros_norm), batch_size):
 #             conn.execute(SQL_INSERT_EXPEDIENTES, registros_norm[i:i+batch_size])
 
-def insertar_expedientes_bulk(registros: list[dict], batch_size: int = 1000) -> int:
+def _insertar_expedientes(conn, registros: list[dict], batch_size: int = 1000) -> int:
     registros_norm = [normalizar_registro(r) for r in registros]
     total_insertadas = 0
 
-    with engine.begin() as conn:
-        for i in range(0, len(registros_norm), batch_size):
-            batch = registros_norm[i:i + batch_size]
-            result = conn.execute(SQL_INSERT_EXPEDIENTES, batch)
-            total_insertadas += result.rowcount if result.rowcount is not None else len(batch)
+    for i in range(0, len(registros_norm), batch_size):
+        batch = registros_norm[i:i + batch_size]
+        result = conn.execute(SQL_INSERT_EXPEDIENTES, batch)
+        total_insertadas += result.rowcount if result.rowcount is not None else len(batch)
 
     return total_insertadas
 
+def insertar_expedientes_bulk(registros: list[dict], batch_size: int = 1000) -> int:
+    if not registros:
+        return 0
+    with db.engine.begin() as conn:
+        return _insertar_expedientes(conn, registros, batch_size)
+
+# -----------------------------
+# Carga masiva con COPY (postgres)
+# -----------------------------
+# Llave natural de expedientes: lo que ya exista con esta llave no se vuelve a insertar
+LLAVE_EXPEDIENTE = ["id_expediente", "fecha_publicacion", "numero_boletin", "numero_pagina"]
+
+# Columnas que llenan los registros de parse_arrendamiento_block (mismas que SQL_INSERT_EXPEDIENTES)
+COLUMNAS_CARGA = [
+    "id_expediente",
+    "actor_demandante",
+    "demandado",
+    "tipo_juicio",
+    "fecha_publicacion",
+    "numero_boletin",
+    "numero_pagina",
+    "estatus",
+]
+
+# La llave va con coalesce: en un índice único los NULL son distintos entre sí y un
+# expediente sin número de boletín (o de página) nunca chocaría con su repetido.
+NULO_LLAVE_EXPEDIENTE = {
+    "id_expediente": "''",
+    "fecha_publicacion": "date '0001-01-01'",
+    "numero_boletin": "-1",
+    "numero_pagina": "-1",
+}
+
+def _llave_coalesce(alias: str = "") -> list[str]:
+    return [f"coalesce({alias}{c}, {NULO_LLAVE_EXPEDIENTE[c]})" for c in LLAVE_EXPEDIENTE]
+
+INDICE_LLAVE_EXPEDIENTE = ", ".join(f"({e})" for e in _llave_coalesce())
+
+SQL_EXISTE_LLAVE_EXPEDIENTES = text("""
+select 1 from pg_indexes
+where tablename = 'expedientes' and indexname = 'ux_expedientes_llave_nulos';
+""")
+
+# Filas repetidas por la llave: todas las de cada grupo menos la de id menor (id_conservado).
+# Solo se borran con `main.py depurar --aplicar`; mientras haya, el índice único no se crea.
+_SQL_REPETIDOS_EXPEDIENTES = f"""
+select * from (
+    select e.*, min(e.id) over (partition by {", ".join(_llave_coalesce("e."))}) as id_conservado
+    from expedientes e
+) r
+where r.id <> r.id_conservado
+"""
+
+SQL_REPETIDOS_EXPEDIENTES = text(_SQL_REPETIDOS_EXPEDIENTES + "order by r.id_conservado, r.id;")
+
+SQL_CONTAR_REPETIDOS_EXPEDIENTES = text(f"select count(*) from ({_SQL_REPETIDOS_EXPEDIENTES}) c;")
+
+SQL_BORRAR_EXPEDIENTES = text("delete from expedientes where id = any(:ids);")
+
+SQL_CREAR_LLAVE_EXPEDIENTES = text(f"""
+create unique index if not exists ux_expedientes_llave_nulos
+on expedientes ({INDICE_LLAVE_EXPEDIENTE});
+""")
+
+# Índice de la versión anterior (columnas sin coalesce); lo sustituye el de arriba
+SQL_QUITAR_LLAVE_ANTERIOR = text("drop index if exists ux_expedientes_llave;")
+
+def _cargar_expedientes_copy(conn, registros: list[dict]) -> tuple[int, int]:
+    columnas = ", ".join(COLUMNAS_CARGA)
+    raw = conn.connection.driver_connection  # psycopg.Connection, misma transacción
+
+    with raw.cursor() as cur:
+        # Staging temporal con los mismos tipos que expedientes; se vacía en cada commit
+        cur.execute(f"""
+            create temp table if not exists expedientes_staging
+            on commit delete rows
+            as select {columnas} from expedientes with no data
+        """)
+
+        with cur.copy(f"copy expedientes_staging ({columnas}) from stdin") as copy:
+            for reg in registros:
+                copy.write_row(tuple(reg.get(c) for c in COLUMNAS_CARGA))
+
+        cur.execute(f"""
+            insert into expedientes ({columnas})
+            select {columnas} from expedientes_staging
+            on conflict do nothing
+        """)
+        insertadas = cur.rowcount
+
+    return insertadas, len(registros) - insertadas
+
+def _cargar_expedientes(conn, registros: list[dict]) -> tuple[int, int]:
+    if not registros:
+        return 0, 0
+    if conn.dialect.name == "postgresql":
+        return _cargar_expedientes_copy(conn, registros)
+
+    # Otros backends (mssql): executemany de siempre, sin manejo de duplicados
+    insertadas = _insertar_expedientes(conn, registros)
+    return insertadas, len(registros) - insertadas
+
+def llaves_expedientes(fecha_ini: date, fecha_fin: date):
+    """
+    Llaves de dedup (dedup.CAMPOS_LLAVE) de los expedientes publicados en
+    [fecha_ini, fecha_fin]; se leen en streaming para precargar el IndiceDedup.
+    """
+    sql = text("""
+        select id_expediente, fecha_publicacion, numero_boletin, tipo_juicio, estatus
+        from expedientes
+        where fecha_publicacion between :ini and :fin;
+    """)
+    with db.engine.connect() as conn:
+        resultado = conn.execution_options(stream_results=True, yield_per=10000).execute(
+            sql, {"ini": fecha_ini, "fin": fecha_fin}
+        )
+        for fila in resultado.mappings():
+            yield fila
+
+def _filtro_paginas(paginas):
+    # Las consultas por boletín se limitan a los numero_pagina dados (None = todas)
+    if paginas is None:
+        return "", {}
+    return " and numero_pagina in :paginas", {"paginas": list(paginas)}
+
+def expedientes_de_boletin(fecha_publicacion: date, numero_boletin: int, paginas=None) -> list[dict]:
+    # Lo cargado para un boletín, con las mismas columnas que llenan los registros del parser
+    filtro, params = _filtro_paginas(paginas)
+    sql = text(f"""
+        select {", ".join(COLUMNAS_CARGA)}
+        from expedientes
+        where fecha_publicacion = :fecha and numero_boletin = :numero{filtro}
+        order by numero_pagina, id;
+    """)
+    if paginas is not None:
+        sql = sql.bindparams(bindparam("paginas", expanding=True))
+    with db.engine.connect() as conn:
+        filas = conn.execute(sql, {"fecha": fecha_publicacion, "numero": numero_boletin, **params}).mappings()
+        return [dict(f) for f in filas]
+
+def reemplazar_expedientes_boletin(fecha_publicacion: date, numero_boletin: int, registros: list[dict],
+                                   paginas) -> tuple[int, int]:
+    """
+    En UNA transacción borra los expedientes del boletín SOLO de las páginas `paginas`
+    (numero_pagina que cubre el almacén de textos) y carga `registros` (re-parseo).
+    Las páginas que no están en el almacén no se tocan. Regresa (borrados, insertados).
+    """
+    paginas = list(paginas)
+    if not paginas:
+        return 0, 0
+    filtro, params = _filtro_paginas(paginas)
+    sql_borrar = text(f"""
+        delete from expedientes
+        where fecha_publicacion = :fecha and numero_boletin = :numero{filtro};
+    """).bindparams(bindparam("paginas", expanding=True))
+    with etapa("insercion", expedientes=len(registros)), db.engine.begin() as conn:
+        borrados = conn.execute(sql_borrar, {"fecha": fecha_publicacion, "numero": numero_boletin, **params}).rowcount
+        insertadas, _ = _cargar_expedientes(conn, registros)
+    return borrados, insertadas
+
+def cargar_expedientes(registros: list[dict]) -> tuple[int, int]:
+    """
+    Carga idempotente: en postgres hace COPY a una tabla staging temporal y luego
+    insert ... on conflict do nothing (el índice único de la llave natural descarta
+    lo ya cargado; si no existe aún, ver asegurar_esquema, se inserta todo).
+    Regresa (insertadas, omitidas por ya existir).
+    """
+    with etapa("insercion", expedientes=len(registros)), db.engine.begin() as conn:
+        return _cargar_expedientes(conn, registros)
+
+# -----------------------------
+# Avance por página (checkpoint)
+# -----------------------------
+SQL_CREAR_PROGRESO = text("""
+create table if not exists progreso_boletin (
+    id_procesamiento bigint primary key,
+    ultima_pagina integer not null default 0,
+    fecha_publicacion date,
+    numero_boletin integer,
+    inicio_columnas integer,
+    total_expedientes integer not null default 0,
+    actualizado timestamp not null default now()
+);
+""")
+
+def asegurar_esquema() -> None:
+    # Tablas de soporte del scraper (solo postgres; en otros backends se crean a mano)
+    if db.engine.dialect.name != "postgresql":
+        return
+    with db.engine.begin() as conn:
+        conn.execute(SQL_CREAR_PROGRESO)
+        if conn.execute(SQL_EXISTE_LLAVE_EXPEDIENTES).first() is None:
+            repetidos = conn.execute(SQL_CONTAR_REPETIDOS_EXPEDIENTES).scalar_one()
+            if repetidos:
+                # Nunca se borra como efecto de una corrida: sin el índice la carga sigue
+                # (on conflict do nothing sin llave) pero no descarta repetidos contra la base
+                print(f"Aviso: expedientes tiene {repetidos} filas repetidas por la llave "
+                      f"({', '.join(LLAVE_EXPEDIENTE)}); no se crea el índice único. "
+                      f"Revisarlas con `python main.py depurar` y borrarlas con --aplicar")
+            else:
+                conn.execute(SQL_CREAR_LLAVE_EXPEDIENTES)
+                conn.execute(SQL_QUITAR_LLAVE_ANTERIOR)
+        if conn.execute(SQL_EXISTE_LLAVE_PROCESAMIENTO).first() is None:
+            repetidos = conn.execute(SQL_REPETIDOS_PROCESAMIENTO).scalar_one()
+            if repetidos:
+                # No se borra nada: el índice único queda pendiente hasta que se depuren
+                print(f"Aviso: procesamiento_boletin tiene {repetidos} boletines con varias filas; "
+                      f"no se crea el índice único, solo uno normal (fecha_boletin, url_boletin)")
+                conn.execute(SQL_CREAR_INDICE_PROCESAMIENTO)
+            else:
+                conn.execute(SQL_CREAR_LLAVE_PROCESAMIENTO)
+
+def expedientes_repetidos() -> list[dict]:
+    # Lo que borraría `depurar_expedientes`: filas completas + id_conservado de su grupo (solo postgres)
+    with db.engine.connect() as conn:
+        return [dict(f) for f in conn.execute(SQL_REPETIDOS_EXPEDIENTES).mappings()]
+
+def depurar_expedientes(ids: list[int]) -> int:
+    """
+    Migración explícita (main.py depurar --aplicar): en UNA transacción borra los
+    expedientes `ids` (los que listó expedientes_repetidos) y crea el índice único.
+    Si entre tanto apareció otro repetido el índice falla y no se borra nada.
+    """
+    with db.engine.begin() as conn:
+        borrados = conn.execute(SQL_BORRAR_EXPEDIENTES, {"ids": list(ids)}).rowcount if ids else 0
+        conn.execute(SQL_CREAR_LLAVE_EXPEDIENTES)
+        conn.execute(SQL_QUITAR_LLAVE_ANTERIOR)
+    return borrados
+
+def iniciar_procesamiento_boletin(
+    fecha_boletin: date,
+    url_boletin: str,
+    descargado: bool | None = None,
+    nombre_archivo: str | None = None,
+) -> tuple[int, dict | None]:
+    """
+    Regresa (id de procesamiento_boletin, avance guardado).
+    Si el boletín quedó INICIADO en una corrida anterior se reutiliza su fila
+    y se regresa su avance para reanudar; si no, se crea la fila en INICIADO.
+    """
+    sql_buscar = text("""
+        select p.id, g.ultima_pagina, g.fecha_publicacion, g.numero_boletin,
+               g.inicio_columnas, g.total_expedientes
+        from procesamiento_boletin p
+        left join progreso_boletin g on g.id_procesamiento = p.id
+        where p.fecha_boletin = :fecha
+          and p.url_boletin = :url
+          and p.estado = 'INICIADO'
+        order by p.id desc
+        limit 1;
+    """)
+    sql_insertar = text("""
+        insert into procesamiento_boletin (
+            fecha_boletin, url_boletin, estado, descargado, nombre_archivo
+        ) values (
+            :fecha, :url, 'INICIADO', :descargado, :nombre_archivo
+        )
+        returning id;
+    """)
+
+    with db.engine.begin() as conn:
+        fila = conn.execute(sql_buscar, {"fecha": fecha_boletin, "url": url_boletin}).mappings().first()
+        if fila is not None:
+            avance = dict(fila) if fila["ultima_pagina"] is not None else None
+            return fila["id"], avance
+
+        nuevo_id = conn.execute(sql_insertar, {
+            "fecha": fecha_boletin,
+            "url": url_boletin,
+            "descargado": descargado,
+            "nombre_archivo": nombre_archivo,
+        }).scalar_one()
+        return nuevo_id, None
+
+def guardar_avance(
+    id_procesamiento: int,
+    ultima_pagina: int,
+    registros: list[dict],
+    fecha_publicacion: date | None,
+    numero_boletin: int | None,
+    inicio_columnas: int | None,
+) -> tuple[int, int]:
+    """
+    En UNA transacción carga los expedientes de las páginas ya procesadas y
+    mueve el checkpoint a `ultima_pagina`. Regresa (insertadas, omitidas).
+    """
+    sql_progreso = text("""
+        insert into progreso_boletin (
+            id_procesamiento, ultima_pagina, fecha_publicacion, numero_boletin,
+            inicio_columnas, total_expedientes, actualizado
+        ) values (
+            :id, :ultima_pagina, :fecha_publicacion, :numero_boletin,
+            :inicio_columnas, :nuevos, now()
+        )
+        on conflict (id_procesamiento) do update set
+            ultima_pagina = excluded.ultima_pagina,
+            fecha_publicacion = excluded.fecha_publicacion,
+            numero_boletin = excluded.numero_boletin,
+            inicio_columnas = excluded.inicio_columnas,
+            total_expedientes = progreso_boletin.total_expedientes + excluded.total_expedientes,
+            actualizado = now();
+    """)
+
+    with etapa("insercion", expedientes=len(registros)), db.engine.begin() as conn:
+        insertadas, omitidas = _cargar_expedientes(conn, registros)
+        conn.execute(sql_progreso, {
+            "id": id_procesamiento,
+            "ultima_pagina": ultima_pagina,
+            "fecha_publicacion": fecha_publicacion,
+            "numero_boletin": numero_boletin,
+            "inicio_columnas": inicio_columnas,
+            "nuevos": len(registros),
+        })
+    return insertadas, omitidas
+
+def terminar_procesamiento_boletin(id_procesamiento: int, total_paginas: int, total_expedientes: int,
+                                   descargado: bool | None = None) -> None:
+    # descargado: si el pack local quedó con páginas (None = no se cambia)
+    sql = text("""
+        update procesamiento_boletin
+        set estado = 'TERMINADO',
+            total_paginas = :total_paginas,
+            total_expedientes = :total_expedientes,
+            descargado = coalesce(:descargado, descargado)
+        where id = :id;
+    """)
+    with db.engine.begin() as conn:
+        conn.execute(sql, {
+            "id": id_procesamiento,
+            "total_paginas": total_paginas,
+            "total_expedientes": total_expedientes,
+            "descargado": descargado,
+        })
+
 
 
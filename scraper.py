@@ -1,9 +1,59 @@
+import gzip
+import io
+import os
+
+# Tamaño del buffer del escritor de transcripciones: se escribe a disco por bloques,
+# no una vez por página
+TAM_BUFFER_TRANSCRIPCION = 256 * 1024
+
+
+def _formato_pagina(texto, pagina):
+    return (
+        "\n" + "=" * 80 + "\n"
+        + f"Página {pagina}\n"
+        + "=" * 80 + "\n"
+        + texto.strip() + "\n"
+    )
+
 
 def guardar_texto_incremental(ruta_archivo, texto, pagina):
     with open(ruta_archivo, "a", encoding="utf-8") as f:
-        f.write("\n" + "=" * 80 + "\n")
-        f.write(f"Página {pagina}\n")
-        f.write("=" * 80 + "\n")
-        f.write(texto.strip() + "\n")
+        f.write(_formato_pagina(texto, pagina))
+
+
+class EscritorTranscripcion:
+    """
+    Transcripción de un boletín (revision_boletin{fecha}.txt[.gz]) escrita página a
+    página conforme terminan, con un solo archivo abierto y buffer propio.
+    - Se abre en modo "w": reprocesar el boletín reemplaza la transcripción, no la duplica.
+      anexar=True (reanudar un boletín) agrega detrás de lo ya escrito (en gzip, otro miembro).
+    - comprimir=True escribe gzip (agrega .gz a la ruta).
+    Mismo formato que guardar_texto_incremental.
+    """
+
+    def __init__(self, ruta: str, comprimir: bool = False, tam_buffer: int = TAM_BUFFER_TRANSCRIPCION,
+                 anexar: bool = False):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        modo = "ab" if anexar else "wb"
+        if comprimir:
+            ruta += ".gz"
+            crudo = gzip.open(ruta, modo)
+        else:
+            crudo = open(ruta, modo, buffering=0)
+        self.ruta = ruta
+        self._f = io.TextIOWrapper(io.BufferedWriter(crudo, tam_buffer), encoding="utf-8")
+
+    def agregar(self, texto: str, pagina: int) -> None:
+        self._f.write(_formato_pagina(texto, pagina))
+
+    def cerrar(self) -> None:
+        if not self._f.closed:
+            self._f.close()
 
+    def __enter__(self):
+        return self
 
+    def __exit__(self, *exc):
+        self.cerrar()
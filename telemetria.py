@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from configuration import settings
+
+# Telemetría por etapa del scraper: listado, redireccion, thumb, descarga, preprocesado,
+# ocr, parseo, insercion.
+# - Cada etapa registra tiempo de reloj, bytes, páginas y expedientes.
+# - Las muestras van al boletín activo del hilo (ver `boletin`) y al total de la corrida.
+# - En hilos/procesos de los pools las muestras se capturan (`capturar`) y se regresan
+#   con el resultado de la tarea; el hilo del boletín las fusiona (`fusionar`).
+# - Salidas: logs JSON (LOG_LEVEL), archivo de texto Prometheus y una fila JSONL por boletín.
+# - Cada fila de boletín lleva el máximo de memoria residente (VmRSS) del proceso y sus hijos
+#   (workers del pool de OCR y su tesseract), muestreado en cada página del boletín.
+
+log = logging.getLogger("scraper.telemetria")
+
+_local = threading.local()
+
+
+class Medicion:
+    # Lo que la etapa quiera reportar además del tiempo
+    __slots__ = ("bytes", "paginas", "expedientes")
+
+    def __init__(self, bytes=0, paginas=0, expedientes=0):
+        self.bytes = bytes
+        self.paginas = paginas
+        self.expedientes = expedientes
+
+
+class Registro:
+    """Acumulado por etapa: llamadas, segundos, bytes, páginas, expedientes."""
+
+    def __init__(self):
+        self.etapas = {}
+        self.inicio = time.perf_counter()
+        self.rss_max = None
+        self._lock = threading.Lock()
+
+    def agregar(self, etapa, segundos, bytes=0, paginas=0, expedientes=0, llamadas=1):
+        with self._lock:
+            acc = self.etapas.get(etapa)
+            if acc is None:
+                acc = self.etapas[etapa] = {"llamadas": 0, "segundos": 0.0, "bytes": 0, "paginas": 0, "expedientes": 0}
+            acc["llamadas"] += llamadas
+            acc["segundos"] += segundos
+            acc["bytes"] += bytes
+            acc["paginas"] += paginas
+            acc["expedientes"] += expedientes
+
+    def copia(self) -> dict:
+        with self._lock:
+            return {k: dict(v) for k, v in self.etapas.items()}
+
+
+# Total de la corrida (este proceso)
+_corrida = Registro()
+
+
+def _registrar(etapa, segundos, bytes=0, paginas=0, expedientes=0, llamadas=1):
+    muestra = (etapa, segundos, bytes, paginas, expedientes, llamadas)
+
+    # Dentro de `capturar`: la muestra viaja con el resultado de la tarea
+    capturadas = getattr(_local, "capturadas", None)
+    if capturadas is not None:
+        capturadas.append(muestra)
+        return
+
+    registro = getattr(_local, "boletin", None)
+    if registro is not None:
+        registro.agregar(*muestra)
+    _corrida.agregar(*muestra)
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("etapa", extra={"datos": {
+            "etapa": etapa, "segundos": round(segundos, 6),
+            "bytes": bytes, "paginas": paginas, "expedientes": expedientes, "llamadas": llamadas,
+        }})
+
+
+@contextmanager
+def etapa(nombre: str, bytes=0, paginas=0, expedientes=0):
+    """
+    Mide una etapa:
+        with etapa("descarga", paginas=1) as m:
+            contenido = ...
+            m.bytes = len(contenido)
+    Se registra aunque la etapa falle (el tiempo perdido también cuenta).
+    """
+    medicion = Medicion(bytes, paginas, expedientes)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        if settings.telemetria_activa:
+            _registrar(nombre, time.perf_counter() - inicio,
+                       medicion.bytes, medicion.paginas, medicion.expedientes)
+
+
+def contar(nombre: str, cantidad: int = 1, segundos: float = 0.0) -> None:
+    # Evento sin tiempo propio (p. ej. páginas descartadas): se acumula como llamadas de una
+    # etapa, en una sola muestra aunque sean muchos. `segundos` es un tiempo asociado al
+    # evento (p. ej. el OCR que ahorró un acierto de la caché)
+    if settings.telemetria_activa and cantidad:
+        _registrar(nombre, segundos, llamadas=cantidad)
+
+
+@contextmanager
+def capturar():
+    # Para tareas de los pools: junta las muestras del hilo/proceso en una lista
+    # (tuplas, se pueden regresar al proceso padre) en vez de registrarlas aquí
+    anterior = getattr(_local, "capturadas", None)
+    muestras = []
+    _local.capturadas = muestras
+    try:
+        yield muestras
+    finally:
+        _local.capturadas = anterior
+
+
+def fusionar(muestras) -> None:
+    for muestra in muestras:
+        _registrar(*muestra)
+
+
+def _por_minuto(cantidad, segundos):
+    return round(cantidad * 60 / segundos, 2) if segundos > 0 else None
+
+
+def _resumen_etapas(etapas: dict) -> dict:
+    resumen = {}
+    for nombre, acc in etapas.items():
+        fila = dict(acc)
+        fila["segundos"] = round(acc["segundos"], 3)
+        if acc["paginas"]:
+            fila["paginas_por_minuto"] = _por_minuto(acc["paginas"], acc["segundos"])
+        resumen[nombre] = fila
+    return resumen
+
+
+# -----------------------------
+# Memoria (RSS)
+# -----------------------------
+def _leer_status(pid, campo: str) -> int | None:
+    # Valor en bytes de un campo "kB" de /proc/<pid>/status (None si no hay /proc o el proceso ya terminó)
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith(campo):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _hijos(pid) -> list[int]:
+    hijos = []
+    try:
+        for tarea in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tarea}/children", encoding="ascii") as f:
+                hijos.extend(int(h) for h in f.read().split())
+    except OSError:
+        pass
+    return hijos
+
+
+def rss_arbol() -> int | None:
+    """
+    Memoria residente actual (VmRSS) de este proceso más la de sus descendientes
+    (workers del pool de procesos y los tesseract que lanzan), en bytes. None sin /proc.
+    """
+    total = _leer_status("self", "VmRSS:")
+    if total is None:
+        return None
+    pendientes = _hijos("self")
+    while pendientes:
+        pid = pendientes.pop()
+        total += _leer_status(pid, "VmRSS:") or 0
+        pendientes.extend(_hijos(pid))
+    return total
+
+
+def muestrear_rss() -> None:
+    """
+    Toma una muestra de rss_arbol para el boletín activo del hilo (se llama en cada página).
+    El pool de OCR es compartido: con boletines concurrentes la muestra es la memoria del
+    árbol de procesos en ese momento, pero solo dentro de la ventana del propio boletín.
+    """
+    registro = getattr(_local, "boletin", None)
+    if registro is None or not settings.telemetria_activa:
+        return
+    rss = rss_arbol()
+    if rss is not None and (registro.rss_max is None or rss > registro.rss_max):
+        registro.rss_max = rss
+
+
+def rss_pico() -> int | None:
+    """Pico de memoria residente de este proceso desde que arrancó, en bytes (VmHWM; si no, getrusage)."""
+    pico = _leer_status("self", "VmHWM:")
+    if pico is not None:
+        return pico
+    try:
+        import resource
+        import sys
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss: kB en Linux, bytes en macOS
+        return pico if sys.platform == "darwin" else pico * 1024
+    except (ImportError, OSError):
+        return None
+
+
+@contextmanager
+def boletin(fecha, url):
+    """
+    Todo lo medido en este hilo dentro del bloque cuenta para el boletín.
+    Al salir escribe su fila de resumen (JSONL) y actualiza el archivo Prometheus.
+    El bloque puede agregar datos a la fila con `fila[...] = ...`.
+    """
+    registro = Registro()
+    anterior = getattr(_local, "boletin", None)
+    _local.boletin = registro
+    fila = {}
+    estado = "error"
+    muestrear_rss()
+    try:
+        yield fila
+        estado = "ok"
+    finally:
+        muestrear_rss()
+        _local.boletin = anterior
+        if registro.rss_max is not None:
+            fila["rss_pico_mb"] = round(registro.rss_max / 2**20, 1)
+        if settings.telemetria_activa:
+            _cerrar_boletin(fecha, url, registro, fila, estado)
+
+
+def _cerrar_boletin(fecha, url, registro, fila, estado):
+    segundos = time.perf_counter() - registro.inicio
+    etapas = registro.copia()
+    paginas = etapas.get("parseo", {}).get("paginas", 0)
+    expedientes = etapas.get("parseo", {}).get("expedientes", 0)
+
+    resumen = {
+        "fecha_registro": datetime.now().isoformat(timespec="seconds"),
+        "fecha_boletin": fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha),
+        "url_boletin": url,
+        "estado": estado,
+        "segundos": round(segundos, 3),
+        "paginas": paginas,
+        "expedientes": expedientes,
+        "paginas_por_minuto": _por_minuto(paginas, segundos),
+        "expedientes_por_pagina": round(expedientes / paginas, 3) if paginas else None,
+        "bytes": sum(e["bytes"] for e in etapas.values()),
+        **fila,
+        "etapas": _resumen_etapas(etapas),
+    }
+
+    log.info("boletin", extra={"datos": resumen})
+
+    ruta = settings.telemetria_resumen
+    if ruta:
+        _asegurar_carpeta(ruta)
+        with _lock_archivos:
+            with open(ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(resumen, ensure_ascii=False) + "\n")
+
+    escribir_prometheus()
+
+
+# -----------------------------
+# Prometheus (textfile collector)
+# -----------------------------
+_lock_archivos = threading.Lock()
+
+_METRICAS = [
+    ("llamadas", "scraper_etapa_llamadas_total", "counter", "Veces que se ejecutó la etapa"),
+    ("segundos", "scraper_etapa_segundos_total", "counter", "Tiempo de reloj acumulado por etapa"),
+    ("bytes", "scraper_etapa_bytes_total", "counter", "Bytes transferidos por etapa"),
+    ("paginas", "scraper_etapa_paginas_total", "counter", "Páginas procesadas por etapa"),
+    ("expedientes", "scraper_etapa_expedientes_total", "counter", "Expedientes por etapa"),
+]
+
+
+def texto_prometheus() -> str:
+    etapas = _corrida.copia()
+    lineas = []
+    for campo, nombre, tipo, ayuda in _METRICAS:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for etapa_nombre, acc in sorted(etapas.items()):
+            lineas.append(f'{nombre}{{etapa="{etapa_nombre}"}} {acc[campo]}')
+    pico = rss_pico()
+    if pico is not None:
+        lineas.append("# HELP scraper_rss_pico_bytes Pico de memoria residente del proceso principal desde que arrancó")
+        lineas.append("# TYPE scraper_rss_pico_bytes gauge")
+        lineas.append(f"scraper_rss_pico_bytes {pico}")
+    lineas.append("# HELP scraper_ultima_actualizacion_segundos Marca de tiempo de la última escritura")
+    lineas.append("# TYPE scraper_ultima_actualizacion_segundos gauge")
+    lineas.append(f"scraper_ultima_actualizacion_segundos {time.time():.0f}")
+    return "\n".join(lineas) + "\n"
+
+
+def escribir_prometheus() -> None:
+    ruta = settings.telemetria_prometheus
+    if not ruta or not settings.telemetria_activa:
+        return
+    _asegurar_carpeta(ruta)
+    # Escritura atómica: el collector nunca lee un archivo a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with _lock_archivos:
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(texto_prometheus())
+        os.replace(temporal, ruta)
+
+
+def totales() -> dict:
+    return _resumen_etapas(_corrida.copia())
+
+
+def _asegurar_carpeta(ruta):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+
+# -----------------------------
+# Logs JSON
+# -----------------------------
+class FormatoJson(logging.Formatter):
+    def format(self, record):
+        salida = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        datos = getattr(record, "datos", None)
+        if datos:
+            salida.update(datos)
+        if record.exc_info:
+            salida["error"] = self.formatException(record.exc_info)
+        return json.dumps(salida, ensure_ascii=False, default=str)
+
+
+def configurar_logs(nivel: str | None = None) -> None:
+    # Un handler JSON en stderr para los loggers "scraper.*", con el nivel de LOG_LEVEL
+    raiz = logging.getLogger("scraper")
+    if any(isinstance(h.formatter, FormatoJson) for h in raiz.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(FormatoJson())
+    raiz.addHandler(handler)
+    raiz.setLevel((nivel or settings.log_level).upper())
+    raiz.propagate = False
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# La raíz del repo en el path: los módulos del scraper son planos, no paquete
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,26 @@
+"""
+Salida dorada de parse_arrendamiento_block.
+
+fixtures/segmentacion.json guarda bloques de texto OCR (páginas del corpus sintético,
+casos pegados con cortes junto a "vs." y al estatus, y casos borde) con los registros
+que dio el parser ANTES de segmentar con _Offsets (text_extractor de 781c9a6^).
+Cualquier cambio del parser que altere un registro hace fallar la prueba; si el cambio
+es intencional, se vuelve a grabar el fixture en el mismo commit.
+"""
+import json
+import os
+
+import pytest
+
+from text_extractor import parse_arrendamiento_block
+
+RUTA = os.path.join(os.path.dirname(__file__), "fixtures", "segmentacion.json")
+
+with open(RUTA, encoding="utf-8") as f:
+    DORADO = json.load(f)
+
+
+@pytest.mark.parametrize("caso", DORADO["casos"], ids=lambda c: f"pag{c['num_pag']}")
+def test_registros_iguales_al_parser_base(caso):
+    registros = parse_arrendamiento_block(caso["bloque"], DORADO["fecha_pub"], DORADO["num_boletin"], caso["num_pag"])
+    assert registros == caso["registros"]
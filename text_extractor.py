@@ -1,5 +1,8 @@
 import re
+from bisect import bisect_left, bisect_right
 from typing import List, Dict, Optional
+from normalizacion import normalizar_bloque, quitar_encabezados, colapsar_espacios
+from telemetria import etapa
 
 # -----------------------------
 # Regex base (tolerantes a OCR)
@@ -32,58 +35,66 @@ RE_CASE_BOUNDARY = re.compile(
     re.IGNORECASE
 )
 
-RE_DIAS = re.compile(r"\b(Lunes|Martes|Mi[eé]rcoles|Jueves|Viernes|S[aá]bado|Domingo)\b", re.IGNORECASE)
-
 def _strip_headers(s: str) -> str:
-    u = s.strip()
-
-    # Encabezados típicos
-    u = re.sub(r"^.*?\bACUERDOS\s+DEL\b\s+.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
-    u = re.sub(r"^.*?\bBOLETIN\b.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
-    u = re.sub(r"^.*?\b(PRIMERA|SEGUNDA|TERCERA)\s+SALA\b.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
-
-    # Basura tipo "lo. 3 Viernes 9 de enero del 2026 ..."
-    if RE_DIAS.search(u) and re.search(r"\b\d{4}\b", u):
-        u = re.sub(r"^.*?\b\d{4}\b\s+", "", u, flags=re.IGNORECASE)
-
-    # Prefijos OCR comunes
-    u = re.sub(r"^\s*(?:lo|l0|I0|IO|I|l)\.?\s*\d+\s*", "", u, flags=re.IGNORECASE)
-    u = re.sub(r"^\s*AS\s+", "", u, flags=re.IGNORECASE)
-
-    return u.strip()
+    return quitar_encabezados(s)
 
 
 def _normalize(text: str) -> str:
-    t = text.replace("\r", " ").replace("\n", " ")
-    t = re.sub(r"\s+", " ", t).strip()
-
-    # Normaliza comillas raras OCR
-    t = t.replace("‘", "'").replace("’", "'").replace("´", "'").replace("“", '"').replace("”", '"')
-
-    # Normaliza "vs"
-    t = re.sub(r"\bvs\b", "vs.", t, flags=re.IGNORECASE)
-    t = re.sub(r"\bvs\.\s*\.", "vs.", t, flags=re.IGNORECASE)
-
-    # Normaliza T. Ap / T.Ap variantes
-    t = re.sub(r"T\s*\.\s*Ap\s*\.", "T.Ap", t, flags=re.IGNORECASE)
-    t = re.sub(r"T\s*\.?\s*Ap\b", "T.Ap", t, flags=re.IGNORECASE)
-    t = re.sub(r"T\s*\.", "T.", t, flags=re.IGNORECASE)
-
-    return t
+    # Espacios/comillas sin regex y vs / T.Ap en una sola pasada
+    return normalizar_bloque(text)
 
 def _clean_name_chunk(s: str) -> str:
     s = s.strip(" .,-;:|")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return colapsar_espacios(s)
+
+RE_EXP_COMPLETO = re.compile(r"\d+/\d{4}/\d{3}$")
 
 def _extract_expedientes(block: str) -> List[str]:
     exps = [m.group(0) for m in RE_EXP.finditer(block)]
 
-    preferidos = [e for e in exps if re.search(r"\d+/\d{4}/\d{3}$", e)]
+    preferidos = [e for e in exps if RE_EXP_COMPLETO.search(e)]
     if preferidos:
-        return [re.sub(r"\s+", " ", e).strip() for e in preferidos]
+        return [colapsar_espacios(e) for e in preferidos]
+
+    return [colapsar_espacios(e) for e in exps]
 
-    return [re.sub(r"\s+", " ", e).strip() for e in exps]
+# Cubre el match más largo de RE_VS / RE_STATUS ("Sentencias.") más el carácter que revisa \b
+_VENTANA_CORTE = 16
+
+class _Offsets:
+    """
+    Todos los matches de un regex sobre el bloque completo (un solo escaneo),
+    con sus inicios ordenados para ubicar con bisect los que rodean una posición.
+    """
+
+    def __init__(self, regex, block: str):
+        self.regex = regex
+        self.block = block
+        self.matches = list(regex.finditer(block))
+        self.inicios = [m.start() for m in self.matches]
+
+    def ultimo_antes(self, corte: int):
+        """
+        Igual a list(regex.finditer(block[:corte]))[-1] (o None), sin copiar el prefijo.
+        Los matches que empiezan antes de corte - _VENTANA_CORTE no dependen del corte;
+        solo la cola junto al corte se vuelve a escanear con endpos.
+        """
+        seguro = corte - _VENTANA_CORTE
+        i = bisect_right(self.inicios, seguro)
+        ultimo = self.matches[i - 1] if i else None
+
+        desde = max(ultimo.end() if ultimo else 0, seguro + 1, 0)
+        for m in self.regex.finditer(self.block, desde, corte):
+            ultimo = m
+        return ultimo
+
+    def primero_desde(self, pos: int):
+        """Igual a regex.search(block, pos)."""
+        i = bisect_left(self.inicios, pos)
+        if i and self.matches[i - 1].end() > pos:
+            # un match que cruza pos puede ocultar otro: se busca directo
+            return self.regex.search(self.block, pos)
+        return self.matches[i] if i < len(self.matches) else None
 
 def parse_arrendamiento_block(block: str, fecha_pub:str, num_boletin:int, num_pag:int ) -> List[Dict]:
     """
@@ -101,6 +112,10 @@ def parse_arrendamiento_block(block: str, fecha_pub:str, num_boletin:int, num_pa
     resultados: List[Dict] = []
     seen = set()
 
+    # Un solo escaneo por regex; los límites de cada caso se ubican con bisect
+    vs_offsets = _Offsets(RE_VS, block)
+    status_offsets = _Offsets(RE_STATUS, block)
+
     # Busca todas las ocurrencias de "tipo de juicio" que incluyan Arrendamiento
     tipo_matches = list(RE_TIPO.finditer(block))
 
@@ -117,15 +132,12 @@ def parse_arrendamiento_block(block: str, fecha_pub:str, num_boletin:int, num_pa
         tipo_start = tipo_m.start()
 
         # 1) Encuentra el ÚLTIMO vs. antes del "Arrendamiento"
-        vs_list = list(RE_VS.finditer(block[:tipo_start]))
-        if not vs_list:
+        vs_m = vs_offsets.ultimo_antes(tipo_start)
+        if vs_m is None:
             continue
-        vs_m = vs_list[-1]
 
         # 2) Encuentra dónde empieza este caso: después del último Acdo/Sent anterior al vs
-        prev_status = None
-        for m in RE_STATUS.finditer(block[:vs_m.start()]):
-            prev_status = m
+        prev_status = status_offsets.ultimo_antes(vs_m.start())
         case_start = prev_status.end() if prev_status else 0
 
         actor = _clean_name_chunk(_strip_headers(block[case_start:vs_m.start()]))
@@ -156,7 +168,7 @@ def parse_arrendamiento_block(block: str, fecha_pub:str, num_boletin:int, num_pa
         # 6) Expedientes SOLO del segmento del caso
 
         # ✅ Corta el segmento en el PRIMER estatus después del tipo_juicio
-        m_endstatus = RE_STATUS.search(block, tipo_start)
+        m_endstatus = status_offsets.primero_desde(tipo_start)
         case_end = m_endstatus.end() if m_endstatus else len(block)
 
         segmento = block[tipo_start:case_end]
@@ -188,6 +200,24 @@ def parse_arrendamiento_block(block: str, fecha_pub:str, num_boletin:int, num_pa
     return resultados
 
 
+def numero_pagina(idx: int) -> int:
+    # numero_pagina que se guarda en expedientes para la página idx del visor
+    return idx + 2
+
+
+def parsear_pagina(texto: str, contexto, idx: int, columnas: bool = True) -> List[Dict]:
+    """
+    Expedientes de una página ya reconocida (idx = página del visor).
+    contexto = (fecha_pub, num_boletin, inicio_columnas) de la portada.
+    Solo las páginas en columnas tienen casos.
+    """
+    fecha_pub, num_boletin, _ = contexto
+    with etapa("parseo", paginas=1) as m:
+        registros = parse_arrendamiento_block(texto, fecha_pub, num_boletin, numero_pagina(idx)) if columnas else []
+        m.expedientes = len(registros)
+    return registros
+
+
 RE_VS_LINE = re.compile(r"^\s*[A-ZÁÉÍÓÚÑ(].{3,300}\bvs\.?\b", re.IGNORECASE)
 RE_CASE_LINE = re.compile(r"^\s*[A-ZÁÉÍÓÚÑ(].{3,300}\bvs\.?\b", re.IGNORECASE)
 RE_END = re.compile(r"\b(Acdo|Sent)\.?\b", re.IGNORECASE)
@@ -226,7 +256,8 @@ def split_into_case_chunks(full_text: str) -> List[str]:
 
     return chunks
 
-def extract_from_full_text(full_text: str) -> List[Dict]:
+def extract_from_full_text(full_text: str, fecha_pub=None, num_boletin: Optional[int] = None,
+                           num_pag: Optional[int] = None) -> List[Dict]:
     results: List[Dict] = []
     seen = set()
 
@@ -234,7 +265,7 @@ def extract_from_full_text(full_text: str) -> List[Dict]:
         if not RE_ARR.search(chunk):
             continue
 
-        regs = parse_arrendamiento_block(chunk)
+        regs = parse_arrendamiento_block(chunk, fecha_pub, num_boletin, num_pag)
         for r in regs:
             key = (r.get("id_expediente"), r.get("actor_demandante"), r.get("demandado"), r.get("tipo_juicio"), r.get("estatus"))
             if key not in seen:
@@ -0,0 +1,167 @@
+import glob
+import gzip
+import io
+import json
+import os
+import threading
+import zlib
+from datetime import date
+
+# Almacén del texto OCR por boletín, para volver a parsear sin descargar ni reconocer:
+#   {carpeta}/{fecha}.jsonl.gz
+#   1a línea: encabezado {"tipo": "boletin", "fecha", "url", "total_paginas",
+#             "fecha_pub", "num_boletin", "inicio_columnas"}
+#   resto:    {"tipo": "pagina", "pagina", "columnas", "texto"} (una por página, al terminar);
+#             más los datos_pagina de pipeline: "escala" y "altura" (de letra, px) de las
+#             páginas completas, "prefiltrada": true si el prefiltro la descartó sin OCR completo
+# - Al reanudar un boletín NO se anexa un miembro gzip nuevo detrás de uno que pudo quedar
+#   cortado: se reescriben las páginas legibles a un temporal que reemplaza al archivo
+#   (os.replace) y se sigue escribiendo en él. Una línea repetida de la misma página gana la última.
+# - `sincronizar` (en cada checkpoint de la base) vacía el compresor con Z_SYNC_FLUSH y hace
+#   fsync: todo lo escrito hasta ahí se puede leer aunque el proceso se caiga después.
+# - El lector descomprime con zlib y se detiene en la última línea completa de un miembro
+#   sin cerrar, sin perder lo anterior.
+
+EXTENSION = ".jsonl.gz"
+
+
+def _a_json(valor):
+    return valor.isoformat() if isinstance(valor, date) else valor
+
+
+def _fecha(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+def ruta_textos(carpeta: str, fecha) -> str:
+    nombre = fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha)
+    return os.path.join(carpeta, f"{nombre}{EXTENSION}")
+
+
+def contexto(encabezado: dict) -> tuple:
+    # (fecha_pub, num_boletin, inicio_columnas), como lo regresa pipeline.contexto_portada
+    return _fecha(encabezado.get("fecha_pub")), encabezado.get("num_boletin"), encabezado.get("inicio_columnas") or 1
+
+
+class EscritorTextos:
+    """
+    Escribe el texto de cada página en cuanto está listo.
+        with EscritorTextos(ruta, encabezado) as textos:
+            textos.agregar(idx, texto, columnas, datos)
+            textos.sincronizar()   # antes de cada checkpoint
+    anexar=True (reanudar) conserva las páginas legibles que ya había; si no, el archivo se reemplaza.
+    """
+
+    def __init__(self, ruta: str, encabezado: dict, anexar: bool = False, nivel: int = 6):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+        previas = []
+        if anexar and os.path.exists(ruta):
+            existente, previas = leer_textos(ruta)
+            if existente is not None:
+                encabezado = {k: v for k, v in existente.items() if k != "tipo"}
+
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        self._gz = gzip.open(temporal, "wb", compresslevel=nivel)
+        self._f = io.TextIOWrapper(self._gz, encoding="utf-8")
+        self._escribir({"tipo": "boletin", **encabezado})
+        for fila in previas:
+            self._escribir(fila)
+        self._sincronizar()
+        # Desde aquí el archivo abierto ES `ruta`: se sigue escribiendo en el mismo inodo
+        os.replace(temporal, ruta)
+
+    def _escribir(self, fila: dict) -> None:
+        self._f.write(json.dumps({k: _a_json(v) for k, v in fila.items()}, ensure_ascii=False) + "\n")
+
+    def agregar(self, pagina: int, texto: str, columnas: bool, datos: dict | None = None) -> None:
+        # datos: pipeline.datos_pagina (escala, altura, prefiltrada)
+        fila = {"tipo": "pagina", "pagina": pagina, "columnas": columnas, **(datos or {}), "texto": texto}
+        with self._lock:
+            self._escribir(fila)
+
+    def _sincronizar(self) -> None:
+        self._f.flush()
+        self._gz.flush(zlib.Z_SYNC_FLUSH)
+        os.fsync(self._gz.fileobj.fileno())
+
+    def sincronizar(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._sincronizar()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _datos(ruta):
+    # Bytes descomprimidos de todos los miembros gzip; en un miembro cortado o dañado
+    # se entrega lo que alcanzó a descomprimirse y se detiene
+    with open(ruta, "rb") as f:
+        crudo = f.read()
+    while crudo:
+        d = zlib.decompressobj(wbits=31)
+        try:
+            yield d.decompress(crudo)
+        except zlib.error:
+            return
+        if not d.eof:
+            return
+        crudo = d.unused_data
+
+
+def _lineas(ruta):
+    resto = b""
+    for bloque in _datos(ruta):
+        resto += bloque
+        *completas, resto = resto.split(b"\n")
+        for linea in completas:
+            if linea.strip():
+                yield linea.decode("utf-8")
+    # `resto` sin salto de línea final = línea a medias: se descarta
+
+
+def leer_textos(ruta: str) -> tuple[dict | None, list[dict]]:
+    """(encabezado, páginas en orden sin repetidos). Encabezado None si el archivo está vacío."""
+    encabezado = None
+    paginas = {}
+    for linea in _lineas(ruta):
+        fila = json.loads(linea)
+        if fila.get("tipo") == "boletin":
+            # Un solo encabezado por archivo; si hubiera más (versiones anteriores) gana el primero
+            encabezado = encabezado or fila
+        else:
+            paginas[fila["pagina"]] = fila
+    return encabezado, [paginas[k] for k in sorted(paginas)]
+
+
+def pendientes_ocr(paginas: list[dict]) -> list[int]:
+    # Páginas guardadas sin OCR completo (descartadas por el prefiltro): `main.py ocr` las completa
+    return [p["pagina"] for p in paginas if p.get("prefiltrada")]
+
+
+def listar_textos(carpeta: str, desde=None, hasta=None) -> list[str]:
+    # Rutas de los boletines guardados, en orden de fecha; desde/hasta inclusivos
+    rutas = []
+    for ruta in sorted(glob.glob(os.path.join(carpeta, f"*{EXTENSION}"))):
+        nombre = os.path.basename(ruta)[:-len(EXTENSION)]
+        try:
+            fecha = date.fromisoformat(nombre)
+        except ValueError:
+            continue
+        if (desde and fecha < _fecha(str(desde))) or (hasta and fecha > _fecha(str(hasta))):
+            continue
+        rutas.append(ruta)
+    return rutas